@@ -13,11 +13,15 @@ Ch format (new):
 """
 
 import argparse
+import gzip
 import json
 import glob
 import sys
 import os
 
+# cha writes plain, gzip, or zstd history files depending on CHA_HISTORY_COMPRESSION
+HISTORY_SUFFIXES = (".json", ".json.gz", ".json.zst")
+
 
 def parse_platform_field(raw_platform):
     """
@@ -106,10 +110,44 @@ def resolve_base_url(args_platform):
     return base_url
 
 
+def history_suffix(filename):
+    # the history suffix of a filename, longest match first so .json.gz wins over .json
+    for suffix in sorted(HISTORY_SUFFIXES, key=len, reverse=True):
+        if filename.endswith(suffix):
+            return suffix
+    return ""
+
+
+def read_history_file(filepath):
+    # read a cha history file, compressed files are decoded the same way cha does
+    with open(filepath, "rb") as f:
+        data = f.read()
+
+    if filepath.endswith(".gz"):
+        data = gzip.decompress(data)
+    elif filepath.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise Exception("reading .json.zst files needs: pip install zstandard")
+
+        # zstd files may use a shared dictionary saved next to them as .zstd_dict_<id>
+        dict_id = zstandard.get_frame_parameters(data).dict_id
+        dict_data = None
+        if dict_id:
+            dict_path = os.path.join(
+                os.path.dirname(os.path.abspath(filepath)), f".zstd_dict_{dict_id}"
+            )
+            with open(dict_path, "rb") as f:
+                dict_data = zstandard.ZstdCompressionDict(f.read())
+        data = zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data)
+
+    return json.loads(data)
+
+
 def convert_file(filepath):
     # convert a single cha history file to ch session format
-    with open(filepath, "r", encoding="utf-8") as f:
-        cha = json.load(f)
+    cha = read_history_file(filepath)
 
     chat = cha.get("chat", [])
     args = cha.get("args", {})
@@ -169,8 +207,11 @@ def gather_input_files(input_path, prefix):
         return [input_path]
 
     if os.path.isdir(input_path):
-        pattern = os.path.join(input_path, f"{prefix}*.json")
-        files = sorted(glob.glob(pattern))
+        files = sorted(
+            path
+            for suffix in HISTORY_SUFFIXES
+            for path in glob.glob(os.path.join(input_path, f"{prefix}*{suffix}"))
+        )
         if not files:
             print(f"No {prefix}*.json files found in: {input_path}", file=sys.stderr)
         return files
@@ -195,6 +236,9 @@ def build_taken_set(check_dir, output_dir, out_prefix):
 def make_output_path(input_filepath, output_dir, in_prefix, out_prefix, taken):
     # generate the output filepath, bumping the epoch in the filename to avoid collisions
     filename = os.path.basename(input_filepath)
+    suffix = history_suffix(filename)
+    if suffix:
+        filename = filename[: -len(suffix)] + ".json"
     if filename.startswith(in_prefix):
         ts_str = filename[len(in_prefix) : -len(".json")]
         if ts_str.isdigit():
@@ -212,7 +256,7 @@ def build_parser():
 
     parser = argparse.ArgumentParser(
         prog="convert_cha_to_ch",
-        description="Convert Cha history files (cha_hs_*.json) to Ch session format (ch_session_*.json).",
+        description="Convert Cha history files (cha_hs_*.json, .json.gz, .json.zst) to Ch session format (ch_session_*.json).",
         epilog=(
             "examples:\n"
             "  %(prog)s -i ./cha_chats -o ./ch_chats\n"
@@ -3,13 +3,18 @@ from pathlib import Path
 import multiprocessing
 import subprocess
 import argparse
+import tempfile
 import fnmatch
 import signal
 import select
+import socket
+import json
 import time
 import sys
 import os
 
+from urllib import request as urllib_request
+
 
 def underline(text):
     return f"\u001b[4m{text}\u001b[0m"
@@ -513,6 +518,312 @@ def run_git_stats():
     analyze_git_repository(cha_root_dir)
 
 
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock_server(cha_root_dir, reply_tokens, chunk_tokens=1, timeout=10):
+    port = _free_port()
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "cha.mockapi",
+            "--port",
+            str(port),
+            "--ttft",
+            "0",
+            "--tokens-per-second",
+            "0",
+            "--chunk-tokens",
+            str(chunk_tokens),
+            "--reply-tokens",
+            str(reply_tokens),
+        ],
+        cwd=cha_root_dir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}/v1"
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            urllib_request.urlopen(f"{base_url}/models", timeout=1).read()
+            return proc, base_url
+        except OSError:
+            time.sleep(0.05)
+    proc.terminate()
+    raise TimeoutError(f"mock server did not start within {timeout}s")
+
+
+def _max_rss_mb(rusage):
+    # NOTE: ru_maxrss is in kilobytes on linux and in bytes on macos
+    if sys.platform == "darwin":
+        return rusage.ru_maxrss / (1024 * 1024)
+    return rusage.ru_maxrss / 1024
+
+
+def run_chat_once(cha_root_dir, base_url, home_dir, tty_mode, timeout=600):
+    command = [
+        sys.executable,
+        "-c",
+        "from cha.main import cli; cli()",
+        "-p",
+        f"{base_url}|mock",
+        "-m",
+        "mock-model",
+        "benchmark",
+    ]
+    env = dict(os.environ, HOME=home_dir, PYTHONPATH=cha_root_dir)
+
+    start = time.perf_counter()
+    output_bytes = 0
+    if tty_mode:
+        master, slave = os.openpty()
+        proc = subprocess.Popen(
+            command,
+            cwd=home_dir,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=slave,
+            stderr=slave,
+        )
+        os.close(slave)
+        try:
+            while True:
+                if time.perf_counter() - start > timeout:
+                    proc.kill()
+                    raise TimeoutError(f"timeout({timeout}s)")
+                ready, _, _ = select.select([master], [], [], 0.1)
+                if master not in ready:
+                    continue
+                try:
+                    chunk = os.read(master, 65536)
+                except OSError:
+                    break
+                if not chunk:
+                    break
+                output_bytes += len(chunk)
+        finally:
+            os.close(master)
+    else:
+        proc = subprocess.Popen(
+            command,
+            cwd=home_dir,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        while True:
+            chunk = proc.stdout.read(65536)
+            if not chunk:
+                break
+            output_bytes += len(chunk)
+        proc.stdout.close()
+
+    _, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    wall_seconds = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"cha exited with code {proc.returncode}")
+
+    return {
+        "wall_seconds": wall_seconds,
+        "cpu_seconds": rusage.ru_utime + rusage.ru_stime,
+        "peak_rss_mb": _max_rss_mb(rusage),
+        "output_bytes": output_bytes,
+    }
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def benchmark_streaming(cha_root_dir, sizes, runs, debug_mode=False):
+    """
+    drive chatbot() against the bundled mock api, the one token response is the
+    baseline that startup cost is subtracted from to get the per chunk overhead
+    """
+    results = {}
+    # NOTE: the throwaway home holds history, journal, and token caches from the runs, it is removed afterwards
+    with tempfile.TemporaryDirectory(prefix="cha_bench_") as home_dir:
+        for mode in ["piped", "tty"]:
+            baseline_wall = None
+            for size in [1] + list(sizes):
+                proc, base_url = start_mock_server(cha_root_dir, reply_tokens=size)
+                try:
+                    samples = []
+                    for _ in range(runs):
+                        samples.append(
+                            run_chat_once(
+                                cha_root_dir,
+                                base_url,
+                                home_dir,
+                                tty_mode=(mode == "tty"),
+                            )
+                        )
+                        if debug_mode:
+                            print(f"{mode} {size} tokens: {samples[-1]}")
+                finally:
+                    proc.terminate()
+                    proc.wait()
+
+                result = {
+                    key: round(_median([sample[key] for sample in samples]), 6)
+                    for key in ["wall_seconds", "cpu_seconds", "peak_rss_mb"]
+                }
+                if size == 1:
+                    baseline_wall = result["wall_seconds"]
+                    continue
+
+                result["per_chunk_overhead_us"] = round(
+                    max(result["wall_seconds"] - baseline_wall, 0) / size * 1_000_000, 3
+                )
+                results[f"{mode}_{size}"] = result
+    return results
+
+
+def compare_benchmarks(results, baseline, tolerance):
+    """
+    return every metric that is more than tolerance (a ratio) worse than the
+    baseline run, all metrics are lower is better
+    """
+    regressions = []
+    for case, metrics in results.items():
+        for metric, value in metrics.items():
+            previous = baseline.get(case, {}).get(metric)
+            if not previous:
+                continue
+            if value > previous * (1 + tolerance):
+                regressions.append((case, metric, previous, value))
+    return regressions
+
+
+def run_benchmarks(sizes, runs, output_path, baseline_path=None, tolerance=0.2):
+    cha_root_dir = str(
+        "/".join(os.path.dirname(os.path.abspath(__file__)).split("/")[:-2]) + "/"
+    )
+
+    start_time = time.time()
+    results = benchmark_streaming(cha_root_dir, sizes=sizes, runs=runs)
+
+    name_len = max(len(case) for case in results)
+    for case, metrics in results.items():
+        print(
+            f"{case:<{name_len}} = {metrics['wall_seconds']:.4f}s wall | {metrics['cpu_seconds']:.4f}s cpu | {metrics['peak_rss_mb']:.1f} MB rss | {metrics['per_chunk_overhead_us']:.2f} us/chunk"
+        )
+
+    with open(output_path, "w") as f:
+        json.dump(
+            {
+                "time": time.time(),
+                "python": sys.version.split()[0],
+                "runs": runs,
+                "results": results,
+            },
+            f,
+            indent=4,
+        )
+    print(f"Results saved to {output_path}")
+    print(f"{time.time() - start_time:.4f} seconds runtime")
+
+    if not baseline_path:
+        return True
+
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f).get("results", {})
+    regressions = compare_benchmarks(results, baseline, tolerance)
+    for case, metric, previous, value in regressions:
+        print(
+            f"\u001b[91mRegression: {case} {metric} {previous} -> {value} (over {tolerance:.0%})\u001b[0m"
+        )
+    if not regressions:
+        print(f"No regressions over {tolerance:.0%} against {baseline_path}")
+    return not regressions
+
+
+def load_startup_profile(source, cha_root_dir):
+    """
+    a startup profile from a json file written by `cha --profile-startup json`,
+    or from any git ref of this repo, which is exported and profiled in place
+    """
+    if os.path.isfile(source):
+        with open(source, "r") as f:
+            return json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix="cha_profile_") as tree_dir:
+        archive = subprocess.run(
+            ["git", "-C", cha_root_dir, "archive", source],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        if archive.returncode != 0:
+            raise RuntimeError(
+                f"'{source}' is neither a file nor a git ref: {archive.stderr.decode().strip()}"
+            )
+        subprocess.run(["tar", "-x", "-C", tree_dir], input=archive.stdout, check=True)
+
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys; sys.argv = ['cha', '--profile-startup', 'json']; from cha.main import cli; cli()",
+            ],
+            cwd=tree_dir,
+            env=dict(os.environ, PYTHONPATH=tree_dir),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            return json.loads(result.stdout)
+        except json.JSONDecodeError:
+            raise RuntimeError(f"'{source}' has no working --profile-startup")
+
+
+def diff_startup_profiles(old_source, new_source, top=15):
+    cha_root_dir = str(
+        "/".join(os.path.dirname(os.path.abspath(__file__)).split("/")[:-2]) + "/"
+    )
+
+    try:
+        old = load_startup_profile(old_source, cha_root_dir)
+        new = load_startup_profile(new_source, cha_root_dir)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return
+
+    for section, limit in [("phases", None), ("packages", top), ("modules", top)]:
+        names = set(old.get(section, {})) | set(new.get(section, {}))
+        rows = []
+        for name in names:
+            before = old.get(section, {}).get(name, 0) * 1000
+            after = new.get(section, {}).get(name, 0) * 1000
+            rows.append((name, before, after, after - before))
+        rows.sort(key=lambda row: abs(row[3]), reverse=True)
+        if limit:
+            rows = rows[:limit]
+        if not rows:
+            continue
+
+        print(underline(f"Startup {section}: {old_source} -> {new_source}"))
+        name_len = max(len(row[0]) for row in rows)
+        for name, before, after, delta in rows:
+            color = "\u001b[91m" if delta > 0 else "\u001b[92m"
+            print(
+                f"{name:<{name_len}} = {before:9.2f} ms -> {after:9.2f} ms ({color}{delta:+.2f} ms\u001b[0m)"
+            )
+        print()
+
+
 def run_all_tests():
     cha_root_dir = str(
         "/".join(os.path.dirname(os.path.abspath(__file__)).split("/")[:-2]) + "/"
@@ -592,6 +903,45 @@ if __name__ == "__main__":
             action="store_true",
             help="Compare cha and ch startup times",
         )
+        parser.add_argument(
+            "--profile-diff",
+            nargs=2,
+            metavar=("OLD", "NEW"),
+            help="Diff two startup breakdowns, each a `cha --profile-startup json` file or a git ref",
+        )
+        parser.add_argument(
+            "-b",
+            "--bench",
+            action="store_true",
+            help="Benchmark the streaming path against the bundled mock api",
+        )
+        parser.add_argument(
+            "--bench-sizes",
+            default="1000,10000,100000",
+            help="Comma separated response sizes in tokens (default: 1000,10000,100000)",
+        )
+        parser.add_argument(
+            "--bench-runs",
+            type=int,
+            default=3,
+            help="Runs per case, the median is reported (default: 3)",
+        )
+        parser.add_argument(
+            "--bench-output",
+            default="bench_results.json",
+            help="Where to write the benchmark results (default: bench_results.json)",
+        )
+        parser.add_argument(
+            "--bench-baseline",
+            default=None,
+            help="Earlier results file to compare against, exits 1 on a regression",
+        )
+        parser.add_argument(
+            "--bench-tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed slowdown against the baseline as a ratio (default: 0.2)",
+        )
 
         args = parser.parse_args()
 
@@ -603,6 +953,8 @@ if __name__ == "__main__":
             args.all,
             args.compare_sizes,
             args.compare_startups,
+            args.bench,
+            args.profile_diff,
         ]
         any_specific_test = any(specific_tests)
 
@@ -623,8 +975,22 @@ if __name__ == "__main__":
                 run_size_comparison()
             if args.compare_startups:
                 run_startup_comparison()
+            if args.profile_diff:
+                diff_startup_profiles(args.profile_diff[0], args.profile_diff[1])
+            if args.bench:
+                passed = run_benchmarks(
+                    sizes=[int(size) for size in args.bench_sizes.split(",")],
+                    runs=args.bench_runs,
+                    output_path=args.bench_output,
+                    baseline_path=args.bench_baseline,
+                    tolerance=args.bench_tolerance,
+                )
+                if not passed:
+                    sys.exit(1)
 
     except (KeyboardInterrupt, EOFError):
         print()
+    except SystemExit:
+        raise
     except:
         pass
@@ -10,7 +10,8 @@ import ast
 import os
 import re
 
-from cha import scraper, colors, utils, config, loading
+from cha import scraper, colors, utils, config, loading, tokenizer
+from cha.render import StreamRenderer
 
 
 def create_mega_prompt(search_results, prompt):
@@ -329,6 +330,8 @@ def answer_search(
     print(colors.red(colors.underline("Check Final Prompt Limit:")))
     cleared_urls = []
     current_prompt_size = utils.count_tokens(mega_prompt, big_model)
+    if current_prompt_size is None:
+        current_prompt_size = utils.count_tokens(mega_prompt, None, fast_mode=True)
     if current_prompt_size < token_limit:
         print(
             colors.yellow(
@@ -341,17 +344,26 @@ def answer_search(
                 f"Final prompt exceeds model's limit of {token_limit} tokens ({current_prompt_size})"
             )
         )
-        while utils.count_tokens(mega_prompt, big_model) >= token_limit:
-            for entry in search_results:
-                if type(entry.get("content")) == str:
-                    url = entry.get("url")
-                    entry["content"] = None
-                    cleared_urls.append(url)
-                    mega_prompt = create_mega_prompt(search_results, prompt)
-                    print(colors.yellow(f"Cleared scraped content for {url}"))
-                    break
-
-    final_output = ""
+        # NOTE: each entry is counted once and subtracted, the mega prompt is rebuilt only after pruning
+        entries = [
+            entry for entry in search_results if type(entry.get("content")) == str
+        ]
+        entry_sizes = tokenizer.count_many(
+            [json.dumps(entry["content"]) for entry in entries], big_model
+        )
+        for entry, entry_size in zip(entries, entry_sizes):
+            if current_prompt_size < token_limit:
+                break
+            url, entry_content = entry.get("url"), entry["content"]
+            entry["content"] = None
+            cleared_urls.append(url)
+            if entry_size is None:
+                entry_size = utils.count_tokens(entry_content, None, fast_mode=True)
+            current_prompt_size -= entry_size
+            print(colors.yellow(f"Cleared scraped content for {url}"))
+        mega_prompt = create_mega_prompt(search_results, prompt)
+
+    renderer = StreamRenderer()
     try:
         print(colors.red(colors.underline("Final Answer:")))
 
@@ -371,15 +383,15 @@ def answer_search(
                     loading.stop_loading()
                     received_first_chunk = True
 
-                content = chunk.choices[0].delta.content
-                final_output += content
-                print(colors.green(content), end="", flush=True)
+                renderer.write(chunk.choices[0].delta.content)
 
-        if final_output.endswith("\n") == False:
+        renderer.flush()
+        if renderer.text().endswith("\n") == False:
             print()
     except (KeyboardInterrupt, EOFError):
+        renderer.flush()
         print()
     finally:
         loading.stop_loading()
 
-    return final_output
+    return renderer.text()
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import time
+import sys
+import os
+
+from cha import colors, config, platforms, client
+from cha.stream import stream_chat_turn
+
+
+def load_prompts(path):
+    """
+    Read a JSONL prompt file, each line is either a JSON string or an object
+    with a "prompt" key and optional "id", "model", and "platform" overrides
+    """
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+
+    prompts = []
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}")
+        if isinstance(item, str):
+            item = {"prompt": item}
+        if not isinstance(item, dict) or not isinstance(item.get("prompt"), str):
+            raise ValueError(f"Line {line_number} is missing a prompt string")
+        prompts.append(item)
+    return prompts
+
+
+def resolve_targets(prompts, default_model):
+    """
+    Resolve every distinct (platform, model) pair once, up front, so any model
+    picker runs before the batch starts and the workers never touch globals
+    """
+    saved_params = dict(client._current_chat_client_params)
+    saved_platform = config.CHA_CURRENT_PLATFORM_NAME
+
+    default_target = {
+        "api_key": saved_params["api_key"],
+        "base_url": saved_params["base_url"],
+        "platform": saved_platform,
+        "model": default_model,
+    }
+
+    targets = {}
+    try:
+        for item in prompts:
+            key = (item.get("platform"), item.get("model"))
+            if key in targets:
+                continue
+
+            if not item.get("platform"):
+                targets[key] = dict(
+                    default_target, model=item.get("model") or default_model
+                )
+                continue
+
+            platform_values = platforms.auto_select_a_platform(
+                platform_key=item["platform"], model_name=item.get("model")
+            )
+            if not platform_values:
+                raise Exception(f"Failed to select platform {item['platform']}")
+
+            platform_name = platform_values.get("platform_name")
+            env_name = platform_values.get("env_name")
+            targets[key] = {
+                # NOTE: a None api key lets the openai client read OPENAI_API_KEY itself
+                "api_key": (
+                    None
+                    if platform_name == "openai"
+                    else os.environ.get(env_name, env_name)
+                ),
+                "base_url": platform_values.get("base_url"),
+                "platform": platform_name,
+                "model": platform_values.get("picked_model"),
+            }
+    finally:
+        client.set_current_chat_client(
+            saved_params["api_key"], saved_params["base_url"]
+        )
+        config.CHA_CURRENT_PLATFORM_NAME = saved_platform
+
+    return targets
+
+
+async def _run_prompt(index, item, target, semaphore):
+    async with semaphore:
+        start_time = time.monotonic()
+        async_client = client.get_async_chat_client(
+            api_key=target["api_key"], base_url=target["base_url"]
+        )
+        messages = [{"role": "user", "content": item["prompt"]}]
+
+        attempts = 0
+        response, error = None, None
+        while attempts <= config.CHA_BATCH_RETRIES:
+            attempts += 1
+            try:
+                turn = await asyncio.wait_for(
+                    stream_chat_turn(
+                        client=async_client,
+                        model=target["model"],
+                        messages=messages,
+                        echo=False,
+                    ),
+                    timeout=config.CHA_BATCH_TIMEOUT_SECONDS,
+                )
+                # NOTE: the stream swallows cancellation, so check whether the whole batch is being stopped
+                if asyncio.current_task().cancelling():
+                    raise asyncio.CancelledError
+                if turn["cancelled"] or turn["stalled"]:
+                    raise asyncio.TimeoutError
+                response, error = turn["content"], None
+                break
+            except asyncio.TimeoutError:
+                error = f"Timed out after {config.CHA_BATCH_TIMEOUT_SECONDS} seconds"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+
+            if attempts <= config.CHA_BATCH_RETRIES:
+                await asyncio.sleep(
+                    config.CHA_BATCH_RETRY_BACKOFF_SECONDS * (2 ** (attempts - 1))
+                )
+
+        return {
+            "index": index,
+            "id": item.get("id"),
+            "platform": target["platform"],
+            "model": target["model"],
+            "response": response,
+            "error": error,
+            "attempts": attempts,
+            "seconds": round(time.monotonic() - start_time, 3),
+        }
+
+
+async def _run_batch(prompts, targets, order):
+    semaphore = asyncio.Semaphore(max(1, int(config.CHA_BATCH_WORKERS)))
+    tasks = [
+        asyncio.create_task(
+            _run_prompt(
+                index,
+                item,
+                targets[(item.get("platform"), item.get("model"))],
+                semaphore,
+            )
+        )
+        for index, item in enumerate(prompts)
+    ]
+
+    failed = 0
+    pending_results = {}
+    next_index = 0
+    try:
+        for finished in asyncio.as_completed(tasks):
+            result = await finished
+            if result["error"] is not None:
+                failed += 1
+
+            if order == "completion":
+                _write_result(result)
+                continue
+
+            # NOTE: input order holds results back until every earlier line is done
+            pending_results[result["index"]] = result
+            while next_index in pending_results:
+                _write_result(pending_results.pop(next_index))
+                next_index += 1
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return failed
+
+
+def _write_result(result):
+    sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def run_batch(path, default_model):
+    prompts = load_prompts(path)
+    if not prompts:
+        if sys.stderr.isatty():
+            print(colors.yellow("No prompts found in batch file"), file=sys.stderr)
+        return
+
+    order = str(config.CHA_BATCH_ORDER).lower()
+    if order not in ["completion", "input"]:
+        raise ValueError(f"Unknown batch order '{config.CHA_BATCH_ORDER}'")
+
+    targets = resolve_targets(prompts, default_model)
+
+    start_time = time.monotonic()
+    failed = client.run_async(_run_batch(prompts, targets, order))
+
+    if sys.stderr.isatty():
+        summary = f"Batch finished: {len(prompts) - failed}/{len(prompts)} succeeded in {round(time.monotonic() - start_time, 2)} seconds"
+        print(colors.red(summary) if failed else colors.green(summary), file=sys.stderr)
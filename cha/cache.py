@@ -0,0 +1,118 @@
+import hashlib
+import json
+import time
+import os
+
+from cha import config
+
+
+def _responses_dir():
+    return os.path.join(config.LOCAL_CHA_CONFIG_CACHE_DIR, "responses")
+
+
+def make_key(platform_name, model_name, messages):
+    """
+    Content address for a request, the same prompt sent to the same model on
+    the same platform always hashes to the same key
+    """
+    normalized = [
+        {
+            "role": str(message.get("role")),
+            "content": str(message.get("content") or "").replace("\r\n", "\n").strip(),
+        }
+        for message in messages
+    ]
+    payload = json.dumps(
+        {
+            "platform": str(platform_name),
+            "model": str(model_name),
+            "messages": normalized,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get(key):
+    path = os.path.join(_responses_dir(), f"{key}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+
+        now = time.time()
+        if now - entry.get("time", 0) > config.CHA_RESPONSE_CACHE_TTL_SECONDS:
+            os.remove(path)
+            return None
+
+        # NOTE: the mtime stays the creation time for expiry, the atime is set to the last hit for lru eviction
+        os.utime(path, (now, os.stat(path).st_mtime))
+        return entry.get("content")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def put(key, platform_name, model_name, content):
+    directory = _responses_dir()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{key}.json")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "time": time.time(),
+                    "platform": platform_name,
+                    "model": model_name,
+                    "content": content,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, path)
+        evict()
+    except OSError:
+        pass
+
+
+def evict():
+    """
+    Drop expired entries, then the least recently used ones until the cache
+    fits in CHA_RESPONSE_CACHE_MAX_BYTES
+    """
+    directory = _responses_dir()
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+
+    now = time.time()
+    entries = []
+    total_size = 0
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if now - stat.st_mtime > config.CHA_RESPONSE_CACHE_TTL_SECONDS:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        entries.append((stat.st_atime, stat.st_size, path))
+        total_size += stat.st_size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total_size <= config.CHA_RESPONSE_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total_size -= size
+        except OSError:
+            pass
@@ -1,9 +1,10 @@
+import importlib.util
 import threading
 import importlib
+import asyncio
 import sys
-import os
 
-from cha import colors
+from cha import colors, config
 
 # NOTE: this module is used to lazy load the openai module and warm it up
 _openai_module_instance = None
@@ -47,23 +48,104 @@ def _ensure_openai_module_is_loaded():
     return _openai_module_instance
 
 
-_current_chat_client_instance = None
+# NOTE: clients are pooled per (base_url, api_key) so switching platforms reuses warm connections
+_chat_client_pool = {}
+_async_chat_client_pool = {}
 
+# NOTE: the sync and async clients always point at the same platform, and a None api_key makes openai read OPENAI_API_KEY
+_current_chat_client_params = {"api_key": None, "base_url": None}
 
-def get_current_chat_client():
-    global _current_chat_client_instance
-    if _current_chat_client_instance is None:
+
+def _http_client_options():
+    httpx = importlib.import_module("httpx")
+
+    options = {
+        "limits": httpx.Limits(
+            max_connections=config.CHA_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=config.CHA_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.CHA_CLIENT_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        "timeout": _client_timeout(),
+    }
+
+    if config.CHA_CLIENT_HTTP2:
+        # NOTE: http/2 needs the optional h2 package, without it cha quietly stays on http/1.1
+        if importlib.util.find_spec("h2") is not None:
+            options["http2"] = True
+
+    return options
+
+
+def _client_timeout():
+    httpx = importlib.import_module("httpx")
+    return httpx.Timeout(
+        config.CHA_CLIENT_TIMEOUT_SECONDS,
+        connect=config.CHA_CLIENT_CONNECT_TIMEOUT_SECONDS,
+    )
+
+
+def get_chat_client(api_key, base_url):
+    key = (base_url, api_key)
+    if key not in _chat_client_pool:
+        openai_mod = _ensure_openai_module_is_loaded()
+        _chat_client_pool[key] = openai_mod.OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=_client_timeout(),
+            http_client=openai_mod.DefaultHttpxClient(**_http_client_options()),
+        )
+    return _chat_client_pool[key]
+
+
+def get_async_chat_client(api_key, base_url):
+    key = (base_url, api_key)
+    if key not in _async_chat_client_pool:
         openai_mod = _ensure_openai_module_is_loaded()
-        _current_chat_client_instance = openai_mod.OpenAI(
-            api_key=os.environ.get("OPENAI_API_KEY")
+        _async_chat_client_pool[key] = openai_mod.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=_client_timeout(),
+            http_client=openai_mod.DefaultAsyncHttpxClient(**_http_client_options()),
         )
-    return _current_chat_client_instance
+    return _async_chat_client_pool[key]
+
+
+def get_current_chat_client():
+    return get_chat_client(
+        api_key=_current_chat_client_params["api_key"],
+        base_url=_current_chat_client_params["base_url"],
+    )
 
 
 def set_current_chat_client(api_key, base_url):
-    global _current_chat_client_instance
-    openai_mod = _ensure_openai_module_is_loaded()
-    _current_chat_client_instance = openai_mod.OpenAI(
-        api_key=api_key, base_url=base_url
+    _current_chat_client_params["api_key"] = api_key
+    _current_chat_client_params["base_url"] = base_url
+    return get_current_chat_client()
+
+
+def get_current_async_chat_client():
+    return get_async_chat_client(
+        api_key=_current_chat_client_params["api_key"],
+        base_url=_current_chat_client_params["base_url"],
     )
-    return _current_chat_client_instance
+
+
+def set_current_async_chat_client(api_key, base_url):
+    # NOTE: keeps the sync client in step so both always talk to the same platform
+    set_current_chat_client(api_key, base_url)
+    return get_current_async_chat_client()
+
+
+_async_runner = None
+
+
+def run_async(coro):
+    """
+    Run a coroutine on cha's long-lived event loop. The loop is reused across
+    calls because async clients keep connections bound to the loop they were
+    first used on.
+    """
+    global _async_runner
+    if _async_runner is None:
+        _async_runner = asyncio.Runner()
+    return _async_runner.run(coro)
@@ -5,7 +5,7 @@ import time
 import sys
 import os
 
-from cha import colors, utils, config
+from cha import colors, utils, config, tokencache
 import pathspec
 
 
@@ -129,6 +129,11 @@ def interactive_selection(root_path, files_dict, include_mode=False):
 
     selected = set()
 
+    # NOTE: the picker only shows counts already in the token cache, files are tokenized once they are selected
+    token_counts = tokencache.cached_file_counts(
+        files_dict, config.DEFAULT_SEARCH_BIG_MODEL
+    )
+
     if include_mode:
         # in include mode, combine directories and files in a single selection
         all_dirs = set()
@@ -164,7 +169,9 @@ def interactive_selection(root_path, files_dict, include_mode=False):
             item_map[f] = ("file", f)
 
         # format paths for better fzf display
-        formatted_paths, path_mapping = utils.format_paths_for_fzf(paths_to_format)
+        formatted_paths, path_mapping = utils.format_paths_for_fzf(
+            paths_to_format, token_counts
+        )
         items_to_select.extend(formatted_paths)
 
         if items_to_select:
@@ -267,7 +274,7 @@ def interactive_selection(root_path, files_dict, include_mode=False):
 
             # format paths for better fzf display
             formatted_files, file_mapping = utils.format_paths_for_fzf(
-                remaining_files_sorted
+                remaining_files_sorted, token_counts
             )
             file_display_list = [config.NOTHING_SELECTED_TAG] + formatted_files
             fzf_input = "\n".join(file_display_list)
@@ -313,13 +320,23 @@ def get_tree_output(dir_path):
         return "Failed to generate tree output"
 
 
+def _file_section(short_path, content):
+    return (
+        f"\nFILE PATH: {short_path}\n" "CONTENT:\n" "`````\n" f"{content}\n" "`````\n"
+    )
+
+
 def generate_text_output(root_path, files_dict, selected_files, include_mode=False):
+    """
+    Build the dump text, returns (text, included files, overhead) where the
+    overhead is everything in the dump except the file contents
+    """
     if include_mode:
         included = [f for f in files_dict if f in selected_files]
         # check for empty selection in include mode
         if not included:
             print(colors.red("No files selected in include mode!"))
-            return None
+            return None, [], ""
     else:
         included = [f for f in files_dict if f not in selected_files]
 
@@ -343,19 +360,26 @@ def generate_text_output(root_path, files_dict, selected_files, include_mode=Fal
     header += tree_output
     header += "`````\n"
 
-    body = []
+    body, overhead = [], [header]
     for f in included:
-        content = files_dict[f]
         short_path = os.path.relpath(f, root_path)
-        section = (
-            f"\nFILE PATH: {short_path}\n"
-            "CONTENT:\n"
-            "`````\n"
-            f"{content}\n"
-            "`````\n"
-        )
-        body.append(section)
-    return header + "".join(body)
+        body.append(_file_section(short_path, files_dict[f]))
+        overhead.append(_file_section(short_path, ""))
+    return header + "".join(body), included, "".join(overhead)
+
+
+def dump_token_count(files_dict, included, overhead, model_name):
+    """
+    Token count of a dump summed from cached per-file counts plus one count
+    of the header and section markers, None when any part can't be counted
+    """
+    file_counts = tokencache.count_files(
+        {f: files_dict[f] for f in included}, model_name
+    )
+    overhead_count = utils.count_tokens(overhead, model_name)
+    if overhead_count is None or None in file_counts.values():
+        return None
+    return overhead_count + sum(file_counts.values())
 
 
 def extract_code(
@@ -397,14 +421,14 @@ def extract_code(
         if selected_files is None:
             return None, 0
 
-    output_text = generate_text_output(
+    output_text, included, overhead = generate_text_output(
         root_path, files_dict, selected_files, include_mode
     )
     if output_text is None:
         return None, 0
 
-    token_count = utils.count_tokens(
-        output_text, config.DEFAULT_SEARCH_BIG_MODEL, False
+    token_count = dump_token_count(
+        files_dict, included, overhead, config.DEFAULT_SEARCH_BIG_MODEL
     )
 
     return output_text, token_count
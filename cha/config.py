@@ -46,6 +46,7 @@ CHANGE_DIRECTORY_ALIAS = "!n"
 RECORD_AUDIO_ALIAS = "!r"
 VOICE_OUTPUT_ALIAS = "!o"
 COPY_TO_CLIPBOARD_ALIAS = "!y"
+PIN_CONTEXT_ALIAS = "!k"
 HELP_ALL_ALIAS = "[ALL]"
 EXPORT_ALL_JSON_ALIAS = "[ALL JSON]"
 SKIP_SEND_TEXT = "!."
@@ -70,6 +71,7 @@ PARAMETER_LESS_ALIASES = [
     RECORD_AUDIO_ALIAS,
     VOICE_OUTPUT_ALIAS,
     COPY_TO_CLIPBOARD_ALIAS,
+    PIN_CONTEXT_ALIAS,
     SKIP_SEND_TEXT,
     HELP_PRINT_OPTIONS_KEY,
 ]
@@ -79,12 +81,88 @@ CHA_DEFAULT_MODEL = "gpt-4.1"
 CHA_DEFAULT_IMAGE_MODEL = "gpt-4o"
 CHA_DEBUG_MODE = False
 CHA_STREAMING_ERROR_LIMIT = 5
+CHA_STREAM_FLUSH_INTERVAL_SECONDS = 0.05
 CHA_CURRENT_PLATFORM_NAME = "openai"
 
+# stream watchdog config variables
+CHA_STREAM_FIRST_TOKEN_TIMEOUT_SECONDS = 60  # None disables the ttft deadline
+CHA_STREAM_STALL_TIMEOUT_SECONDS = 60  # None disables the inter-chunk deadline
+CHA_STREAM_RETRIES = 1
+CHA_STREAM_INCLUDE_USAGE = (
+    True  # ask for the usage block, skipped on platforms that reject it
+)
+CHA_STREAM_HEDGE_AFTER_SECONDS = (
+    None  # None disables hedging, else a second request races the first after this long
+)
+CHA_STREAM_HEDGE_FALLBACK = (
+    None  # "platform|model" to hedge against, None means the same platform and model
+)
+
 # local config variables
 CHA_DEFAULT_SHOW_PRINT_TITLE = True
 CHA_LOCAL_SAVE_ALL_CHA_CHATS = False
 CHA_SHOW_VISITED_DIRECTORIES_ON_EXIT = True
+CHA_SHOW_TURN_STATS = False  # print ttft, tok/s, and duration after every answer
+
+# history journal configs, interactive sessions that save history append each turn to ~/.cha/journal/ so "cha -c" can recover them after a crash
+CHA_HISTORY_JOURNAL_ENABLED = True
+CHA_HISTORY_JOURNAL_FSYNC_SECONDS = (
+    1.0  # records are flushed at once, fsync runs at most this often
+)
+
+# history compression configs, None writes plain json, "gzip" or "zstd" (needs the zstandard package) write compressed files, existing files are converted with --recompress-history
+CHA_HISTORY_COMPRESSION = None
+
+# context budget configs, before each send the oldest unpinned messages are dropped ("drop") or replaced by a summary from a small model ("summarize") to keep the request under budget
+CHA_CONTEXT_BUDGET_ENABLED = False
+CHA_CONTEXT_POLICY = "drop"
+CHA_CONTEXT_MAX_TOKENS = (
+    None  # None means CHA_CONTEXT_WINDOW_RATIO of the model's context window
+)
+CHA_CONTEXT_WINDOW_RATIO = 0.75
+CHA_CONTEXT_KEEP_RECENT_MESSAGES = 4
+CHA_CONTEXT_SUMMARY_MODEL = (
+    None  # None means DEFAULT_SEARCH_SMALL_MODEL on openai, else the current model
+)
+CHA_CONTEXT_SUMMARY_MAX_TOKENS = 1000
+CHA_CONTEXT_DEFAULT_WINDOW = (
+    None  # window for models missing below, None applies no budget to them
+)
+CHA_CONTEXT_MODEL_WINDOWS = {
+    "gpt-4.1": 1_000_000,
+    "gpt-4o": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8_192,
+    "gpt-3.5-turbo": 16_385,
+    "gpt-5": 400_000,
+    "o1": 200_000,
+    "o3": 200_000,
+    "o4": 200_000,
+    "claude": 200_000,
+    "gemini": 1_000_000,
+    "grok": 131_072,
+    "deepseek": 64_000,
+    "llama": 128_000,
+    "mistral": 32_000,
+    "qwen": 32_000,
+    "kimi": 128_000,
+}
+
+# response cache configs, when enabled non-interactive prompts (string, pipe, or file) replay a stored answer for the same platform, model, and messages
+CHA_RESPONSE_CACHE_ENABLED = False
+CHA_RESPONSE_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+CHA_RESPONSE_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# token count cache configs, per-file and per-text token counts are stored in ~/.cha/cache/tokens.db so unchanged content is never re-tokenized
+CHA_TOKEN_CACHE_ENABLED = True
+CHA_TOKEN_CACHE_MAX_ENTRIES = 200_000
+
+# token counting configs, texts at least this long are split at line breaks and the pieces are encoded on all cores, piped input is read in chunk sized blocks
+CHA_TOKENIZER_PARALLEL_MIN_CHARS = 8 * 1024 * 1024
+CHA_TOKENIZER_CHUNK_CHARS = 1024 * 1024
+CHA_TOKEN_COUNT_PROGRESS_SECONDS = (
+    1  # None disables the -ct progress line for piped input
+)
 
 # shell command security config, block only very dangerous commands
 BLOCKED_SHELL_COMMANDS = [
@@ -180,6 +258,25 @@ TERMINAL_THEME_CODES = {
 # external, custom, 3rd party tools if defined by the user externally
 EXTERNAL_TOOLS = []
 
+# openai client connection pool configs, set CHA_CLIENT_HTTP2 to True only if the "h2" package is installed
+CHA_CLIENT_MAX_CONNECTIONS = 20
+CHA_CLIENT_MAX_KEEPALIVE_CONNECTIONS = 10
+CHA_CLIENT_KEEPALIVE_EXPIRY_SECONDS = 120
+CHA_CLIENT_TIMEOUT_SECONDS = 600
+CHA_CLIENT_CONNECT_TIMEOUT_SECONDS = 10
+CHA_CLIENT_HTTP2 = False
+
+# batch mode configs, CHA_BATCH_ORDER is "completion" (write each result as it finishes) or "input" (keep the prompt file's order)
+CHA_BATCH_WORKERS = 4
+CHA_BATCH_RETRIES = 2
+CHA_BATCH_RETRY_BACKOFF_SECONDS = 1
+CHA_BATCH_TIMEOUT_SECONDS = 300
+CHA_BATCH_ORDER = "completion"
+
+# background daemon configs, non-interactive calls are forwarded to it when "cha --daemon" is running
+CHA_DAEMON_SOCKET_PATH = "~/.cha/cha.sock"
+CHA_DAEMON_FORWARDING = True
+
 # http request configs
 REQUEST_DEFAULT_TIMEOUT_SECONDS = 10
 REQUEST_DEFAULT_RETRY_COUNT = 1
@@ -349,464 +446,485 @@ SUPPORTED_VIDEO_FORMATS = [
     ".mod",
 ]
 
+# local mock api config variables, start the server with `python -m cha.mockapi`
+CHA_MOCK_API_HOST = "127.0.0.1"
+CHA_MOCK_API_PORT = 11435
+CHA_MOCK_API_MODELS = ["mock-model", "mock-model-large"]
+
+
 # last updated on 3-11-2025
-THIRD_PARTY_PLATFORMS = {
-    "groq": {
-        "models": {
-            "url": "https://api.groq.com/openai/v1/models",
-            "headers": {
-                "Authorization": f"Bearer {os.environ.get('GROQ_API_KEY')}",
-                "Content-Type": "application/json",
+def _build_third_party_platforms():
+    return {
+        "groq": {
+            "models": {
+                "url": "https://api.groq.com/openai/v1/models",
+                "headers": {
+                    "Authorization": f"Bearer {os.environ.get('GROQ_API_KEY')}",
+                    "Content-Type": "application/json",
+                },
+                "json_name_path": "data.id",
             },
-            "json_name_path": "data.id",
+            "base_url": "https://api.groq.com/openai/v1",
+            "env_name": "GROQ_API_KEY",
+            "docs": "https://console.groq.com/docs/overview",
         },
-        "base_url": "https://api.groq.com/openai/v1",
-        "env_name": "GROQ_API_KEY",
-        "docs": "https://console.groq.com/docs/overview",
-    },
-    "deepseek": {
-        "models": {
-            "url": "https://api.deepseek.com/models",
-            "headers": {
-                "Accept": "application/json",
-                "Authorization": f"Bearer {os.environ.get('DEEP_SEEK_API_KEY')}",
+        "deepseek": {
+            "models": {
+                "url": "https://api.deepseek.com/models",
+                "headers": {
+                    "Accept": "application/json",
+                    "Authorization": f"Bearer {os.environ.get('DEEP_SEEK_API_KEY')}",
+                },
+                "json_name_path": "data.id",
             },
-            "json_name_path": "data.id",
+            "base_url": "https://api.deepseek.com",
+            "env_name": "DEEP_SEEK_API_KEY",
+            "docs": "https://api-docs.deepseek.com/",
         },
-        "base_url": "https://api.deepseek.com",
-        "env_name": "DEEP_SEEK_API_KEY",
-        "docs": "https://api-docs.deepseek.com/",
-    },
-    "together": {
-        "models": {
-            "url": "https://api.together.xyz/v1/models",
-            "headers": {
-                "accept": "application/json",
-                "authorization": f"Bearer {os.environ.get('TOGETHER_API_KEY')}",
+        "together": {
+            "models": {
+                "url": "https://api.together.xyz/v1/models",
+                "headers": {
+                    "accept": "application/json",
+                    "authorization": f"Bearer {os.environ.get('TOGETHER_API_KEY')}",
+                },
+                "json_name_path": "id",
             },
-            "json_name_path": "id",
+            "base_url": "https://api.together.xyz/v1",
+            "env_name": "TOGETHER_API_KEY",
+            "docs": "https://docs.together.ai/docs/introduction",
         },
-        "base_url": "https://api.together.xyz/v1",
-        "env_name": "TOGETHER_API_KEY",
-        "docs": "https://docs.together.ai/docs/introduction",
-    },
-    "google": {
-        "models": {
-            "url": f"https://generativelanguage.googleapis.com/v1beta/models?key={os.environ.get('GEMINI_API_KEY')}",
-            "headers": {},
-            "json_name_path": "models.name",
+        "google": {
+            "models": {
+                "url": f"https://generativelanguage.googleapis.com/v1beta/models?key={os.environ.get('GEMINI_API_KEY')}",
+                "headers": {},
+                "json_name_path": "models.name",
+            },
+            "base_url": "https://generativelanguage.googleapis.com/v1beta/openai/",
+            "env_name": "GEMINI_API_KEY",
+            "docs": "https://ai.google.dev/gemini-api/docs",
         },
-        "base_url": "https://generativelanguage.googleapis.com/v1beta/openai/",
-        "env_name": "GEMINI_API_KEY",
-        "docs": "https://ai.google.dev/gemini-api/docs",
-    },
-    "ollama": {
-        "models": {
-            "url": "http://localhost:11434/api/tags",
-            "headers": {},
-            "json_name_path": "models.name",
+        "ollama": {
+            "models": {
+                "url": "http://localhost:11434/api/tags",
+                "headers": {},
+                "json_name_path": "models.name",
+            },
+            "base_url": "http://localhost:11434/v1",
+            "env_name": "ollama",
+            "docs": "https://github.com/ollama/ollama/blob/main/docs/api.md",
         },
-        "base_url": "http://localhost:11434/v1",
-        "env_name": "ollama",
-        "docs": "https://github.com/ollama/ollama/blob/main/docs/api.md",
-    },
-    "xai": {
-        "models": {
-            "url": "https://api.x.ai/v1/models",
-            "headers": {
-                "accept": "application/json",
-                "authorization": f"Bearer {os.environ.get('XAI_API_KEY')}",
+        "xai": {
+            "models": {
+                "url": "https://api.x.ai/v1/models",
+                "headers": {
+                    "accept": "application/json",
+                    "authorization": f"Bearer {os.environ.get('XAI_API_KEY')}",
+                },
+                "json_name_path": "data.id",
             },
-            "json_name_path": "data.id",
+            "base_url": "https://api.x.ai/v1",
+            "env_name": "XAI_API_KEY",
+            "docs": "https://docs.x.ai/docs/overview",
         },
-        "base_url": "https://api.x.ai/v1",
-        "env_name": "XAI_API_KEY",
-        "docs": "https://docs.x.ai/docs/overview",
-    },
-    "anthropic": {
-        "models": {
-            "url": "https://api.anthropic.com/v1/models",
-            "headers": {
-                "x-api-key": f"{os.environ.get('ANTHROPIC_API_KEY')}",
-                "anthropic-version": "2023-06-01",
+        "anthropic": {
+            "models": {
+                "url": "https://api.anthropic.com/v1/models",
+                "headers": {
+                    "x-api-key": f"{os.environ.get('ANTHROPIC_API_KEY')}",
+                    "anthropic-version": "2023-06-01",
+                },
+                "json_name_path": "data.id",
             },
-            "json_name_path": "data.id",
+            "base_url": "https://api.anthropic.com/v1/",
+            "env_name": "ANTHROPIC_API_KEY",
+            "docs": "https://docs.anthropic.com/",
         },
-        "base_url": "https://api.anthropic.com/v1/",
-        "env_name": "ANTHROPIC_API_KEY",
-        "docs": "https://docs.anthropic.com/",
-    },
-}
+    }
+
 
 # urls that contain video data that can be scrapped using cha's scraper
-VALID_VIDEO_ROOT_URL_DOMAINS_FOR_SCRAPING = [
-    "https://www.youtube.com",
-    "https://youtube.com",
-    "https://www.vimeo.com",
-    "https://vimeo.com",
-    "https://www.twitch.tv",
-    "https://twitch.tv",
-    "https://www.dailymotion.com",
-    "https://dailymotion.com",
-    "https://www.dropout.tv",
-    "https://dropout.tv",
-    "https://www.linkedin.com",
-    "https://linkedin.com",
-    "https://www.twitter.com",
-    "https://twitter.com",
-    "https://x.com",
-    "https://www.cbsnews.com",
-    "https://cbsnews.com",
-    "https://www.cnn.com",
-    "https://cnn.com",
-    "https://www.cnbc.com",
-    "https://cnbc.com",
-    "https://www.abc.com.au",
-    "https://abc.com.au",
-    "https://www.bbc.co.uk",
-    "https://bbc.co.uk",
-    "https://www.cartoonnetwork.com",
-    "https://cartoonnetwork.com",
-    "https://www.canalplus.fr",
-    "https://canalplus.fr",
-    "https://www.arte.tv",
-    "https://arte.tv",
-    "https://www.cbc.ca",
-    "https://cbc.ca",
-    "https://www.3sat.de",
-    "https://3sat.de",
-    "https://www.ard.de",
-    "https://ard.de",
-]
+def _build_valid_video_root_url_domains_for_scraping():
+    return [
+        "https://www.youtube.com",
+        "https://youtube.com",
+        "https://www.vimeo.com",
+        "https://vimeo.com",
+        "https://www.twitch.tv",
+        "https://twitch.tv",
+        "https://www.dailymotion.com",
+        "https://dailymotion.com",
+        "https://www.dropout.tv",
+        "https://dropout.tv",
+        "https://www.linkedin.com",
+        "https://linkedin.com",
+        "https://www.twitter.com",
+        "https://twitter.com",
+        "https://x.com",
+        "https://www.cbsnews.com",
+        "https://cbsnews.com",
+        "https://www.cnn.com",
+        "https://cnn.com",
+        "https://www.cnbc.com",
+        "https://cnbc.com",
+        "https://www.abc.com.au",
+        "https://abc.com.au",
+        "https://www.bbc.co.uk",
+        "https://bbc.co.uk",
+        "https://www.cartoonnetwork.com",
+        "https://cartoonnetwork.com",
+        "https://www.canalplus.fr",
+        "https://canalplus.fr",
+        "https://www.arte.tv",
+        "https://arte.tv",
+        "https://www.cbc.ca",
+        "https://cbc.ca",
+        "https://www.3sat.de",
+        "https://3sat.de",
+        "https://www.ard.de",
+        "https://ard.de",
+    ]
+
 
 """
 ascii, text based, terminal animations for loading animations
 - https://stackoverflow.com/questions/2685435/cooler-ascii-spinners
 - https://raw.githubusercontent.com/sindresorhus/cli-spinners/master/spinners.json
 """
-LOADING_ANIMATIONS = {
-    "basic": ["|", "/", "-", "\\"],
-    "star": ["✶", "✸", "✹", "✺", "✹", "✷"],
-    "vertical_bar": [
-        "▉",
-        "▊",
-        "▋",
-        "▌",
-        "▍",
-        "▎",
-        "▏",
-        "▎",
-        "▍",
-        "▌",
-        "▋",
-        "▊",
-        "▉",
-    ],
-    "dots": ["▖", "▘", "▝", "▗"],
-    "rectangles": ["◰", "◳", "◲", "◱"],
-    "circles": ["◴", "◷", "◶", "◵"],
-    "halfcircles": ["◐", "◓", "◑", "◒"],
-    "braille": [
-        "⣾",
-        "⣽",
-        "⣻",
-        "⢿",
-        "⡿",
-        "⣟",
-        "⣯",
-        "⣷",
-        "⠁",
-        "⠂",
-        "⠄",
-        "⡀",
-        "⢀",
-        "⠠",
-        "⠐",
-        "⠈",
-    ],
-}
+
+
+def _build_loading_animations():
+    return {
+        "basic": ["|", "/", "-", "\\"],
+        "star": ["✶", "✸", "✹", "✺", "✹", "✷"],
+        "vertical_bar": [
+            "▉",
+            "▊",
+            "▋",
+            "▌",
+            "▍",
+            "▎",
+            "▏",
+            "▎",
+            "▍",
+            "▌",
+            "▋",
+            "▊",
+            "▉",
+        ],
+        "dots": ["▖", "▘", "▝", "▗"],
+        "rectangles": ["◰", "◳", "◲", "◱"],
+        "circles": ["◴", "◷", "◶", "◵"],
+        "halfcircles": ["◐", "◓", "◑", "◒"],
+        "braille": [
+            "⣾",
+            "⣽",
+            "⣻",
+            "⢿",
+            "⡿",
+            "⣟",
+            "⣯",
+            "⣷",
+            "⠁",
+            "⠂",
+            "⠄",
+            "⡀",
+            "⢀",
+            "⠠",
+            "⠐",
+            "⠈",
+        ],
+    }
+
 
 # last updated on March 29, 2025
-FILETYPE_TO_EXTENSION = {
-    "python": ".py",
-    "py": ".py",
-    "bash": ".sh",
-    "sh": ".sh",
-    "shell": ".sh",
-    "zsh": ".zsh",
-    "fish": ".fish",
-    "powershell": ".ps1",
-    "ps1": ".ps1",
-    "bat": ".bat",
-    "cmd": ".cmd",
-    "javascript": ".js",
-    "js": ".js",
-    "typescript": ".ts",
-    "ts": ".ts",
-    "coffee": ".coffee",
-    "vue": ".vue",
-    "jsx": ".jsx",
-    "tsx": ".tsx",
-    "java": ".java",
-    "c": ".c",
-    "h": ".h",
-    "hpp": ".hpp",
-    "c++": ".cpp",
-    "cpp": ".cpp",
-    "cxx": ".cpp",
-    "cc": ".cpp",
-    "cs": ".cs",  # C#
-    "go": ".go",
-    "golang": ".go",
-    "php": ".php",
-    "rb": ".rb",  # Ruby
-    "ruby": ".rb",
-    "swift": ".swift",
-    "kotlin": ".kt",
-    "kt": ".kt",
-    "rs": ".rs",  # Rust
-    "rust": ".rs",
-    "dart": ".dart",
-    "r": ".r",
-    "m": ".m",  # MATLAB/Objective-C
-    "matlab": ".m",
-    "mm": ".mm",  # Objective-C++
-    "scala": ".scala",
-    "lua": ".lua",
-    "perl": ".pl",
-    "pl": ".pl",
-    "pm": ".pm",
-    "tcl": ".tcl",
-    "groovy": ".groovy",
-    "gradle": ".gradle",
-    "clojure": ".clj",
-    "clj": ".clj",
-    "cljs": ".cljs",
-    "cljc": ".cljc",
-    "fsharp": ".fs",
-    "fs": ".fs",
-    "elixir": ".ex",
-    "ex": ".ex",
-    "exs": ".exs",
-    "asp": ".asp",
-    "aspx": ".aspx",
-    "jsp": ".jsp",
-    "sas": ".sas",
-    "d": ".d",  # D language
-    "pas": ".pas",  # Pascal
-    "pp": ".pp",  # Free Pascal
-    "asm": ".asm",  # Assembly
-    "s": ".s",
-    "v": ".v",  # Verilog
-    "sv": ".sv",  # SystemVerilog
-    "vhd": ".vhd",
-    "vhdl": ".vhdl",
-    "cl": ".cl",  # OpenCL
-    "html": ".html",
-    "htm": ".htm",
-    "css": ".css",
-    "sass": ".sass",
-    "scss": ".scss",
-    "xml": ".xml",
-    "svg": ".svg",
-    "svgz": ".svgz",
-    "yaml": ".yaml",
-    "yml": ".yml",
-    "toml": ".toml",
-    "ini": ".ini",
-    "cfg": ".cfg",
-    "conf": ".conf",
-    "json": ".json",
-    "json5": ".json5",
-    "jsonc": ".jsonc",
-    "sql": ".sql",
-    "tsql": ".sql",
-    "pgsql": ".sql",
-    "db2": ".sql",
-    "csv": ".csv",
-    "tsv": ".tsv",
-    "proto": ".proto",
-    "proto3": ".proto",
-    "ipynb": ".ipynb",
-    "md": ".md",
-    "markdown": ".md",
-    "rst": ".rst",
-    "org": ".org",
-    "latex": ".tex",
-    "tex": ".tex",
-    "rmd": ".Rmd",
-    "rmarkdown": ".Rmd",
-    "rproj": ".Rproj",
-    "properties": ".properties",
-    "inf": ".inf",
-    "plist": ".plist",
-    "txt": ".txt",
-    "text": ".txt",
-    "plaintext": ".txt",
-    "rtf": ".rtf",
-    "doc": ".doc",
-    "docx": ".docx",
-    "odt": ".odt",
-    "ppt": ".ppt",
-    "pptx": ".pptx",
-    "pdf": ".pdf",
-    "xls": ".xls",
-    "xlsx": ".xlsx",
-    "ods": ".ods",
-    "rtfd": ".rtfd",
-    "man": ".man",
-    "makefile": ".makefile",
-    "dockerfile": ".dockerfile",
-    "docker-compose": ".yml",
-    "gitignore": ".gitignore",
-    "gitattributes": ".gitattributes",
-    "editorconfig": ".editorconfig",
-    "eslint": ".eslintrc.js",
-    "eslintjson": ".eslintrc.json",
-    "npmrc": ".npmrc",
-    "babelrc": ".babelrc",
-    "prettierrc": ".prettierrc",
-    "gradlew": ".gradlew",
-    "env": ".env",
-    "nvmrc": ".nvmrc",
-    "npmignore": ".npmignore",
-    "dockerignore": ".dockerignore",
-    "clang-format": ".clang-format",
-    "clang-tidy": ".clang-tidy",
-    "desktop": ".desktop",
-    "service": ".service",
-    "socket": ".socket",
-    "timer": ".timer",
-    "target": ".target",
-    "jpg": ".jpg",
-    "jpeg": ".jpeg",
-    "png": ".png",
-    "gif": ".gif",
-    "bmp": ".bmp",
-    "webp": ".webp",
-    "ico": ".ico",
-    "tiff": ".tiff",
-    "tga": ".tga",
-    "psd": ".psd",
-    "xcf": ".xcf",
-    "exr": ".exr",
-    "hdr": ".hdr",
-    "mp4": ".mp4",
-    "mkv": ".mkv",
-    "mov": ".mov",
-    "avi": ".avi",
-    "mpg": ".mpg",
-    "mpeg": ".mpeg",
-    "flv": ".flv",
-    "f4v": ".f4v",
-    "swf": ".swf",
-    "mp3": ".mp3",
-    "wav": ".wav",
-    "flac": ".flac",
-    "ogg": ".ogg",
-    "wma": ".wma",
-    "ape": ".ape",
-    "aiff": ".aiff",
-    "au": ".au",
-    "caf": ".caf",
-    "mid": ".mid",
-    "midi": ".midi",
-    "xm": ".xm",
-    "it": ".it",
-    "s3m": ".s3m",
-    "mod": ".mod",
-    "zip": ".zip",
-    "7z": ".7z",
-    "gz": ".gz",
-    "xz": ".xz",
-    "lz": ".lz",
-    "lzma": ".lzma",
-    "lzo": ".lzo",
-    "lzop": ".lzop",
-    "cpio": ".cpio",
-    "z": ".z",
-    "tar": ".tar",
-    "tgz": ".tgz",
-    "bz2": ".bz2",
-    "rar": ".rar",
-    "ps": ".ps",
-    "eps": ".eps",
-    "ai": ".ai",
-}
+def _build_filetype_to_extension():
+    return {
+        "python": ".py",
+        "py": ".py",
+        "bash": ".sh",
+        "sh": ".sh",
+        "shell": ".sh",
+        "zsh": ".zsh",
+        "fish": ".fish",
+        "powershell": ".ps1",
+        "ps1": ".ps1",
+        "bat": ".bat",
+        "cmd": ".cmd",
+        "javascript": ".js",
+        "js": ".js",
+        "typescript": ".ts",
+        "ts": ".ts",
+        "coffee": ".coffee",
+        "vue": ".vue",
+        "jsx": ".jsx",
+        "tsx": ".tsx",
+        "java": ".java",
+        "c": ".c",
+        "h": ".h",
+        "hpp": ".hpp",
+        "c++": ".cpp",
+        "cpp": ".cpp",
+        "cxx": ".cpp",
+        "cc": ".cpp",
+        "cs": ".cs",  # C#
+        "go": ".go",
+        "golang": ".go",
+        "php": ".php",
+        "rb": ".rb",  # Ruby
+        "ruby": ".rb",
+        "swift": ".swift",
+        "kotlin": ".kt",
+        "kt": ".kt",
+        "rs": ".rs",  # Rust
+        "rust": ".rs",
+        "dart": ".dart",
+        "r": ".r",
+        "m": ".m",  # MATLAB/Objective-C
+        "matlab": ".m",
+        "mm": ".mm",  # Objective-C++
+        "scala": ".scala",
+        "lua": ".lua",
+        "perl": ".pl",
+        "pl": ".pl",
+        "pm": ".pm",
+        "tcl": ".tcl",
+        "groovy": ".groovy",
+        "gradle": ".gradle",
+        "clojure": ".clj",
+        "clj": ".clj",
+        "cljs": ".cljs",
+        "cljc": ".cljc",
+        "fsharp": ".fs",
+        "fs": ".fs",
+        "elixir": ".ex",
+        "ex": ".ex",
+        "exs": ".exs",
+        "asp": ".asp",
+        "aspx": ".aspx",
+        "jsp": ".jsp",
+        "sas": ".sas",
+        "d": ".d",  # D language
+        "pas": ".pas",  # Pascal
+        "pp": ".pp",  # Free Pascal
+        "asm": ".asm",  # Assembly
+        "s": ".s",
+        "v": ".v",  # Verilog
+        "sv": ".sv",  # SystemVerilog
+        "vhd": ".vhd",
+        "vhdl": ".vhdl",
+        "cl": ".cl",  # OpenCL
+        "html": ".html",
+        "htm": ".htm",
+        "css": ".css",
+        "sass": ".sass",
+        "scss": ".scss",
+        "xml": ".xml",
+        "svg": ".svg",
+        "svgz": ".svgz",
+        "yaml": ".yaml",
+        "yml": ".yml",
+        "toml": ".toml",
+        "ini": ".ini",
+        "cfg": ".cfg",
+        "conf": ".conf",
+        "json": ".json",
+        "json5": ".json5",
+        "jsonc": ".jsonc",
+        "sql": ".sql",
+        "tsql": ".sql",
+        "pgsql": ".sql",
+        "db2": ".sql",
+        "csv": ".csv",
+        "tsv": ".tsv",
+        "proto": ".proto",
+        "proto3": ".proto",
+        "ipynb": ".ipynb",
+        "md": ".md",
+        "markdown": ".md",
+        "rst": ".rst",
+        "org": ".org",
+        "latex": ".tex",
+        "tex": ".tex",
+        "rmd": ".Rmd",
+        "rmarkdown": ".Rmd",
+        "rproj": ".Rproj",
+        "properties": ".properties",
+        "inf": ".inf",
+        "plist": ".plist",
+        "txt": ".txt",
+        "text": ".txt",
+        "plaintext": ".txt",
+        "rtf": ".rtf",
+        "doc": ".doc",
+        "docx": ".docx",
+        "odt": ".odt",
+        "ppt": ".ppt",
+        "pptx": ".pptx",
+        "pdf": ".pdf",
+        "xls": ".xls",
+        "xlsx": ".xlsx",
+        "ods": ".ods",
+        "rtfd": ".rtfd",
+        "man": ".man",
+        "makefile": ".makefile",
+        "dockerfile": ".dockerfile",
+        "docker-compose": ".yml",
+        "gitignore": ".gitignore",
+        "gitattributes": ".gitattributes",
+        "editorconfig": ".editorconfig",
+        "eslint": ".eslintrc.js",
+        "eslintjson": ".eslintrc.json",
+        "npmrc": ".npmrc",
+        "babelrc": ".babelrc",
+        "prettierrc": ".prettierrc",
+        "gradlew": ".gradlew",
+        "env": ".env",
+        "nvmrc": ".nvmrc",
+        "npmignore": ".npmignore",
+        "dockerignore": ".dockerignore",
+        "clang-format": ".clang-format",
+        "clang-tidy": ".clang-tidy",
+        "desktop": ".desktop",
+        "service": ".service",
+        "socket": ".socket",
+        "timer": ".timer",
+        "target": ".target",
+        "jpg": ".jpg",
+        "jpeg": ".jpeg",
+        "png": ".png",
+        "gif": ".gif",
+        "bmp": ".bmp",
+        "webp": ".webp",
+        "ico": ".ico",
+        "tiff": ".tiff",
+        "tga": ".tga",
+        "psd": ".psd",
+        "xcf": ".xcf",
+        "exr": ".exr",
+        "hdr": ".hdr",
+        "mp4": ".mp4",
+        "mkv": ".mkv",
+        "mov": ".mov",
+        "avi": ".avi",
+        "mpg": ".mpg",
+        "mpeg": ".mpeg",
+        "flv": ".flv",
+        "f4v": ".f4v",
+        "swf": ".swf",
+        "mp3": ".mp3",
+        "wav": ".wav",
+        "flac": ".flac",
+        "ogg": ".ogg",
+        "wma": ".wma",
+        "ape": ".ape",
+        "aiff": ".aiff",
+        "au": ".au",
+        "caf": ".caf",
+        "mid": ".mid",
+        "midi": ".midi",
+        "xm": ".xm",
+        "it": ".it",
+        "s3m": ".s3m",
+        "mod": ".mod",
+        "zip": ".zip",
+        "7z": ".7z",
+        "gz": ".gz",
+        "xz": ".xz",
+        "lz": ".lz",
+        "lzma": ".lzma",
+        "lzo": ".lzo",
+        "lzop": ".lzop",
+        "cpio": ".cpio",
+        "z": ".z",
+        "tar": ".tar",
+        "tgz": ".tgz",
+        "bz2": ".bz2",
+        "rar": ".rar",
+        "ps": ".ps",
+        "eps": ".eps",
+        "ai": ".ai",
+    }
+
+
+def _build_normalized_language_mapping():
+    return {
+        "AFRIKAANS": {"espeak_code": "af", "say_voice_name": None},
+        "AMHARIC": {"espeak_code": "am", "say_voice_name": None},
+        "ARAGONESE": {"espeak_code": "an", "say_voice_name": None},
+        "ARABIC": {"espeak_code": "ar", "say_voice_name": "Majed"},
+        "ASSAMESE": {"espeak_code": "as", "say_voice_name": None},
+        "AZERBAIJANI": {"espeak_code": "az", "say_voice_name": None},
+        "BELARUSIAN": {"espeak_code": "be", "say_voice_name": None},
+        "BULGARIAN": {"espeak_code": "bg", "say_voice_name": "Daria"},
+        "BENGALI": {"espeak_code": "bn", "say_voice_name": None},
+        "BOSNIAN": {"espeak_code": "bs", "say_voice_name": None},
+        "CATALAN": {"espeak_code": "ca", "say_voice_name": "Montse"},
+        "CHINESE": {"espeak_code": "cmn", "say_voice_name": None},
+        "CZECH": {"espeak_code": "cs", "say_voice_name": "Zuzana"},
+        "WELSH": {"espeak_code": "cy", "say_voice_name": None},
+        "DANISH": {"espeak_code": "da", "say_voice_name": "Sara"},
+        "GERMAN": {"espeak_code": "de", "say_voice_name": "Shelley (German (Germany))"},
+        "GREEK": {"espeak_code": "el", "say_voice_name": "Melina"},
+        "ENGLISH": {"espeak_code": "en", "say_voice_name": "Karen"},
+        "ESPERANTO": {"espeak_code": "eo", "say_voice_name": None},
+        "SPANISH": {"espeak_code": "es", "say_voice_name": "Shelley (Spanish (Spain))"},
+        "ESTONIAN": {"espeak_code": "et", "say_voice_name": None},
+        "BASQUE": {"espeak_code": "eu", "say_voice_name": None},
+        "PERSIAN": {"espeak_code": "fa", "say_voice_name": None},
+        "FINNISH": {
+            "espeak_code": "fi",
+            "say_voice_name": "Shelley (Finnish (Finland))",
+        },
+        "FRENCH": {"espeak_code": "fr", "say_voice_name": "Thomas"},
+        "IRISH": {"espeak_code": "ga", "say_voice_name": None},
+        "SCOTTISH": {"espeak_code": "gd", "say_voice_name": None},
+        "GUJARATI": {"espeak_code": "gu", "say_voice_name": None},
+        "HEBREW": {"espeak_code": "he", "say_voice_name": "Carmit"},
+        "HINDI": {"espeak_code": "hi", "say_voice_name": "Lekha"},
+        "CROATIAN": {"espeak_code": "hr", "say_voice_name": "Lana"},
+        "HUNGARIAN": {"espeak_code": "hu", "say_voice_name": "T\u00fcnde"},
+        "ARMENIAN": {"espeak_code": "hy", "say_voice_name": None},
+        "INDONESIAN": {"espeak_code": "id", "say_voice_name": "Damayanti"},
+        "ICELANDIC": {"espeak_code": "is", "say_voice_name": None},
+        "ITALIAN": {"espeak_code": "it", "say_voice_name": "Shelley (Italian (Italy))"},
+        "JAPANESE": {"espeak_code": "ja", "say_voice_name": "Kyoko"},
+        "GEORGIAN": {"espeak_code": "ka", "say_voice_name": None},
+        "KANNADA": {"espeak_code": "kn", "say_voice_name": None},
+        "KOREAN": {"espeak_code": "ko", "say_voice_name": "Yuna"},
+        "KURDISH": {"espeak_code": "ku", "say_voice_name": None},
+        "LATIN": {"espeak_code": "la", "say_voice_name": None},
+        "LITHUANIAN": {"espeak_code": "lt", "say_voice_name": None},
+        "LATVIAN": {"espeak_code": "lv", "say_voice_name": None},
+        "MACEDONIAN": {"espeak_code": "mk", "say_voice_name": None},
+        "MALAYALAM": {"espeak_code": "ml", "say_voice_name": None},
+        "MARATHI": {"espeak_code": "mr", "say_voice_name": None},
+        "MALAY": {"espeak_code": "ms", "say_voice_name": "Amira"},
+        "MALTESE": {"espeak_code": "mt", "say_voice_name": None},
+        "NORWEGIAN": {"espeak_code": "nb", "say_voice_name": "Nora"},
+        "NEPALI": {"espeak_code": "ne", "say_voice_name": None},
+        "DUTCH": {"espeak_code": "nl", "say_voice_name": "Xander"},
+        "PUNJABI": {"espeak_code": "pa", "say_voice_name": None},
+        "POLISH": {"espeak_code": "pl", "say_voice_name": "Zosia"},
+        "PORTUGUESE": {"espeak_code": "pt", "say_voice_name": "Joana"},
+        "ROMANIAN": {"espeak_code": "ro", "say_voice_name": "Ioana"},
+        "RUSSIAN": {"espeak_code": "ru", "say_voice_name": "Milena"},
+        "SINHALA": {"espeak_code": "si", "say_voice_name": None},
+        "SLOVAK": {"espeak_code": "sk", "say_voice_name": "Laura"},
+        "SLOVENIAN": {"espeak_code": "sl", "say_voice_name": None},
+        "ALBANIAN": {"espeak_code": "sq", "say_voice_name": None},
+        "SERBIAN": {"espeak_code": "sr", "say_voice_name": None},
+        "SWEDISH": {"espeak_code": "sv", "say_voice_name": "Alva"},
+        "SWAHILI": {"espeak_code": "sw", "say_voice_name": None},
+        "TAMIL": {"espeak_code": "ta", "say_voice_name": None},
+        "TELUGU": {"espeak_code": "te", "say_voice_name": None},
+        "THAI": {"espeak_code": "th", "say_voice_name": "Kanya"},
+        "TURKISH": {"espeak_code": "tr", "say_voice_name": "Yelda"},
+        "UKRAINIAN": {"espeak_code": "uk", "say_voice_name": "Lesya"},
+        "URDU": {"espeak_code": "ur", "say_voice_name": None},
+        "VIETNAMESE": {"espeak_code": "vi", "say_voice_name": "Linh"},
+    }
 
-NORMALIZED_LANGUAGE_MAPPING = {
-    "AFRIKAANS": {"espeak_code": "af", "say_voice_name": None},
-    "AMHARIC": {"espeak_code": "am", "say_voice_name": None},
-    "ARAGONESE": {"espeak_code": "an", "say_voice_name": None},
-    "ARABIC": {"espeak_code": "ar", "say_voice_name": "Majed"},
-    "ASSAMESE": {"espeak_code": "as", "say_voice_name": None},
-    "AZERBAIJANI": {"espeak_code": "az", "say_voice_name": None},
-    "BELARUSIAN": {"espeak_code": "be", "say_voice_name": None},
-    "BULGARIAN": {"espeak_code": "bg", "say_voice_name": "Daria"},
-    "BENGALI": {"espeak_code": "bn", "say_voice_name": None},
-    "BOSNIAN": {"espeak_code": "bs", "say_voice_name": None},
-    "CATALAN": {"espeak_code": "ca", "say_voice_name": "Montse"},
-    "CHINESE": {"espeak_code": "cmn", "say_voice_name": None},
-    "CZECH": {"espeak_code": "cs", "say_voice_name": "Zuzana"},
-    "WELSH": {"espeak_code": "cy", "say_voice_name": None},
-    "DANISH": {"espeak_code": "da", "say_voice_name": "Sara"},
-    "GERMAN": {"espeak_code": "de", "say_voice_name": "Shelley (German (Germany))"},
-    "GREEK": {"espeak_code": "el", "say_voice_name": "Melina"},
-    "ENGLISH": {"espeak_code": "en", "say_voice_name": "Karen"},
-    "ESPERANTO": {"espeak_code": "eo", "say_voice_name": None},
-    "SPANISH": {"espeak_code": "es", "say_voice_name": "Shelley (Spanish (Spain))"},
-    "ESTONIAN": {"espeak_code": "et", "say_voice_name": None},
-    "BASQUE": {"espeak_code": "eu", "say_voice_name": None},
-    "PERSIAN": {"espeak_code": "fa", "say_voice_name": None},
-    "FINNISH": {"espeak_code": "fi", "say_voice_name": "Shelley (Finnish (Finland))"},
-    "FRENCH": {"espeak_code": "fr", "say_voice_name": "Thomas"},
-    "IRISH": {"espeak_code": "ga", "say_voice_name": None},
-    "SCOTTISH": {"espeak_code": "gd", "say_voice_name": None},
-    "GUJARATI": {"espeak_code": "gu", "say_voice_name": None},
-    "HEBREW": {"espeak_code": "he", "say_voice_name": "Carmit"},
-    "HINDI": {"espeak_code": "hi", "say_voice_name": "Lekha"},
-    "CROATIAN": {"espeak_code": "hr", "say_voice_name": "Lana"},
-    "HUNGARIAN": {"espeak_code": "hu", "say_voice_name": "T\u00fcnde"},
-    "ARMENIAN": {"espeak_code": "hy", "say_voice_name": None},
-    "INDONESIAN": {"espeak_code": "id", "say_voice_name": "Damayanti"},
-    "ICELANDIC": {"espeak_code": "is", "say_voice_name": None},
-    "ITALIAN": {"espeak_code": "it", "say_voice_name": "Shelley (Italian (Italy))"},
-    "JAPANESE": {"espeak_code": "ja", "say_voice_name": "Kyoko"},
-    "GEORGIAN": {"espeak_code": "ka", "say_voice_name": None},
-    "KANNADA": {"espeak_code": "kn", "say_voice_name": None},
-    "KOREAN": {"espeak_code": "ko", "say_voice_name": "Yuna"},
-    "KURDISH": {"espeak_code": "ku", "say_voice_name": None},
-    "LATIN": {"espeak_code": "la", "say_voice_name": None},
-    "LITHUANIAN": {"espeak_code": "lt", "say_voice_name": None},
-    "LATVIAN": {"espeak_code": "lv", "say_voice_name": None},
-    "MACEDONIAN": {"espeak_code": "mk", "say_voice_name": None},
-    "MALAYALAM": {"espeak_code": "ml", "say_voice_name": None},
-    "MARATHI": {"espeak_code": "mr", "say_voice_name": None},
-    "MALAY": {"espeak_code": "ms", "say_voice_name": "Amira"},
-    "MALTESE": {"espeak_code": "mt", "say_voice_name": None},
-    "NORWEGIAN": {"espeak_code": "nb", "say_voice_name": "Nora"},
-    "NEPALI": {"espeak_code": "ne", "say_voice_name": None},
-    "DUTCH": {"espeak_code": "nl", "say_voice_name": "Xander"},
-    "PUNJABI": {"espeak_code": "pa", "say_voice_name": None},
-    "POLISH": {"espeak_code": "pl", "say_voice_name": "Zosia"},
-    "PORTUGUESE": {"espeak_code": "pt", "say_voice_name": "Joana"},
-    "ROMANIAN": {"espeak_code": "ro", "say_voice_name": "Ioana"},
-    "RUSSIAN": {"espeak_code": "ru", "say_voice_name": "Milena"},
-    "SINHALA": {"espeak_code": "si", "say_voice_name": None},
-    "SLOVAK": {"espeak_code": "sk", "say_voice_name": "Laura"},
-    "SLOVENIAN": {"espeak_code": "sl", "say_voice_name": None},
-    "ALBANIAN": {"espeak_code": "sq", "say_voice_name": None},
-    "SERBIAN": {"espeak_code": "sr", "say_voice_name": None},
-    "SWEDISH": {"espeak_code": "sv", "say_voice_name": "Alva"},
-    "SWAHILI": {"espeak_code": "sw", "say_voice_name": None},
-    "TAMIL": {"espeak_code": "ta", "say_voice_name": None},
-    "TELUGU": {"espeak_code": "te", "say_voice_name": None},
-    "THAI": {"espeak_code": "th", "say_voice_name": "Kanya"},
-    "TURKISH": {"espeak_code": "tr", "say_voice_name": "Yelda"},
-    "UKRAINIAN": {"espeak_code": "uk", "say_voice_name": "Lesya"},
-    "URDU": {"espeak_code": "ur", "say_voice_name": None},
-    "VIETNAMESE": {"espeak_code": "vi", "say_voice_name": "Linh"},
-}
 
 # NOTE: do NOT modify the code below because it allows the loading of custom configs if provided!
 
@@ -824,59 +942,113 @@ TOOL_MOST_HAVE_VARIABLES = {
 LOCAL_CHA_CONFIG_DIR = os.path.join(str(Path.home()), ".cha/")
 LOCAL_CHA_CONFIG_HISTORY_DIR = os.path.join(LOCAL_CHA_CONFIG_DIR, "history/")
 LOCAL_CHA_CONFIG_TOOLS_DIR = os.path.join(LOCAL_CHA_CONFIG_DIR, "tools/")
+LOCAL_CHA_CONFIG_CACHE_DIR = os.path.join(LOCAL_CHA_CONFIG_DIR, "cache/")
 LOCAL_CHA_CONFIG_FILE = os.path.join(LOCAL_CHA_CONFIG_DIR, "config.py")
 
-_external_config_loaded = False
+# NOTE: the big tables above are built on first access, a user config can still override them as plain variables
+_LAZY_TABLES = {
+    "THIRD_PARTY_PLATFORMS": _build_third_party_platforms,
+    "VALID_VIDEO_ROOT_URL_DOMAINS_FOR_SCRAPING": _build_valid_video_root_url_domains_for_scraping,
+    "LOADING_ANIMATIONS": _build_loading_animations,
+    "FILETYPE_TO_EXTENSION": _build_filetype_to_extension,
+    "NORMALIZED_LANGUAGE_MAPPING": _build_normalized_language_mapping,
+}
+
+
+def __getattr__(name):
+    builder = _LAZY_TABLES.get(name)
+    if builder is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = builder()
+    globals()[name] = value
+    return value
+
+
+_MISSING = object()
 
+# NOTE: source is the (path, mtime) of the executed config, defaults hold the values it replaced
+_external_config = {"source": None, "defaults": {}, "tools": None}
+_external_tools_cache = {"source": None, "tools": None}
 
-def _load_external_config():
-    global _external_config_loaded
-    if _external_config_loaded:
-        return
 
-    CUSTOM_CONFIG_PATH = os.environ.get("CHA_PYTHON_CUSTOM_CONFIG_PATH")
-    OVERRIGHT_CONFIG = None
-    if CUSTOM_CONFIG_PATH and os.path.exists(CUSTOM_CONFIG_PATH):
-        OVERRIGHT_CONFIG = CUSTOM_CONFIG_PATH
-    elif LOCAL_CHA_CONFIG_FILE and os.path.exists(LOCAL_CHA_CONFIG_FILE):
-        OVERRIGHT_CONFIG = LOCAL_CHA_CONFIG_FILE
+def _external_config_path():
+    custom_config_path = os.environ.get("CHA_PYTHON_CUSTOM_CONFIG_PATH")
+    if custom_config_path and os.path.exists(custom_config_path):
+        return custom_config_path
+    if LOCAL_CHA_CONFIG_FILE and os.path.exists(LOCAL_CHA_CONFIG_FILE):
+        return LOCAL_CHA_CONFIG_FILE
+    return None
 
-    if OVERRIGHT_CONFIG:
-        spec = importlib.util.spec_from_file_location(
-            "external_config", OVERRIGHT_CONFIG
-        )
+
+def load_external_config():
+    """
+    Execute the user's config file and apply its uppercase variables. The file
+    only runs again once its path or mtime changes, and variables a newer
+    version no longer sets go back to their defaults.
+    """
+    path = _external_config_path()
+    source = None
+    if path:
+        try:
+            source = (path, os.stat(path).st_mtime_ns)
+        except OSError:
+            path = None
+    if source == _external_config["source"]:
+        return False
+
+    values = {}
+    if path:
+        spec = importlib.util.spec_from_file_location("external_config", path)
         external_config = importlib.util.module_from_spec(spec)
         spec.loader.exec_module(external_config)
+        values = {
+            key: value
+            for key, value in external_config.__dict__.items()
+            if key.isupper()
+        }
 
-        for key, value in external_config.__dict__.items():
-            if key.isupper():
-                globals()[key] = value
+    previous_defaults = _external_config["defaults"]
+    for key, default in previous_defaults.items():
+        if key in values:
+            continue
+        if default is _MISSING:
+            globals().pop(key, None)
+        else:
+            globals()[key] = default
 
-    _external_config_loaded = True
+    defaults = {}
+    for key, value in values.items():
+        # NOTE: tools are only applied once something asks for them
+        if key == "EXTERNAL_TOOLS":
+            continue
+        defaults[key] = previous_defaults.get(key, globals().get(key, _MISSING))
+        globals()[key] = value
 
+    _external_config["source"] = source
+    _external_config["defaults"] = defaults
+    _external_config["tools"] = values.get("EXTERNAL_TOOLS")
+    return True
 
-def get_external_tools_execute():
-    _load_external_config()
-
-    if len(globals().get("EXTERNAL_TOOLS", [])) > 0:
-        return local.get_tools()
-    return []
 
+def get_external_tools_execute():
+    """
+    Validated external tools, checked once per loaded config instead of on
+    every message
+    """
+    global EXTERNAL_TOOLS
 
-CUSTOM_CONFIG_PATH = os.environ.get("CHA_PYTHON_CUSTOM_CONFIG_PATH")
-OVERRIGHT_CONFIG = None
-if CUSTOM_CONFIG_PATH and os.path.exists(CUSTOM_CONFIG_PATH):
-    OVERRIGHT_CONFIG = CUSTOM_CONFIG_PATH
-elif LOCAL_CHA_CONFIG_FILE and os.path.exists(LOCAL_CHA_CONFIG_FILE):
-    OVERRIGHT_CONFIG = LOCAL_CHA_CONFIG_FILE
+    if _external_tools_cache["source"] != _external_config["source"]:
+        _external_tools_cache["tools"] = None
+    if _external_tools_cache["tools"] is None:
+        EXTERNAL_TOOLS = _external_config["tools"] or []
+        tools = []
+        if len(globals().get("EXTERNAL_TOOLS", [])) > 0:
+            tools = local.get_tools()
+        _external_tools_cache["source"] = _external_config["source"]
+        _external_tools_cache["tools"] = tools
+    return _external_tools_cache["tools"]
 
-if OVERRIGHT_CONFIG != None:
-    spec = importlib.util.spec_from_file_location("external_config", OVERRIGHT_CONFIG)
-    external_config = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(external_config)
 
-    for key, value in external_config.__dict__.items():
-        if key.isupper() and key != "EXTERNAL_TOOLS":
-            globals()[key] = value
+load_external_config()
 
 EXTERNAL_TOOLS_EXECUTE = []
@@ -0,0 +1,152 @@
+import hashlib
+
+from cha import colors, config, utils
+from cha.client import get_current_chat_client
+
+# NOTE: summaries are cached by the hashes of the messages they replace, so a longer span reuses the summary of its prefix
+_summary_cache = {}
+
+
+def model_window(model_name):
+    """
+    Context window of a model, matched by the longest known name prefix,
+    CHA_CONTEXT_DEFAULT_WINDOW (None by default) for unknown models
+    """
+    name = str(model_name).lower().split("/")[-1]
+    best_match, best_window = "", config.CHA_CONTEXT_DEFAULT_WINDOW
+    for prefix, window in config.CHA_CONTEXT_MODEL_WINDOWS.items():
+        if name.startswith(prefix.lower()) and len(prefix) > len(best_match):
+            best_match, best_window = prefix, window
+    return best_window
+
+
+def token_budget(model_name):
+    """
+    Token budget for one request, None when the model's window is unknown
+    """
+    if config.CHA_CONTEXT_MAX_TOKENS:
+        return int(config.CHA_CONTEXT_MAX_TOKENS)
+    window = model_window(model_name)
+    if not window:
+        return None
+    return int(window * config.CHA_CONTEXT_WINDOW_RATIO)
+
+
+def _content_hash(content):
+    return hashlib.sha256(str(content).encode("utf-8")).hexdigest()
+
+
+def _summary_model(model_name):
+    if config.CHA_CONTEXT_SUMMARY_MODEL:
+        return config.CHA_CONTEXT_SUMMARY_MODEL
+    if config.CHA_CURRENT_PLATFORM_NAME == "openai":
+        return config.DEFAULT_SEARCH_SMALL_MODEL
+    return model_name
+
+
+def _summarize(messages, model_name):
+    hashes = tuple(_content_hash(m["content"]) for m in messages)
+    if hashes in _summary_cache:
+        return _summary_cache[hashes]
+
+    # start from the longest span that was already summarized
+    previous_summary, start = None, 0
+    for end in range(len(hashes) - 1, 0, -1):
+        if hashes[:end] in _summary_cache:
+            previous_summary, start = _summary_cache[hashes[:end]], end
+            break
+
+    transcript = "\n\n".join(
+        f"{m['role'].upper()}: {m['content']}" for m in messages[start:]
+    )
+    if previous_summary:
+        transcript = f"SUMMARY SO FAR: {previous_summary}\n\n{transcript}"
+
+    prompt = utils.rls(f"""
+        Summarize the following part of a conversation between a user and an assistant.
+        Keep every fact, decision, name, file path, and piece of code that later messages may depend on.
+        Write it as a compact list of notes, no more than {config.CHA_CONTEXT_SUMMARY_MAX_TOKENS} tokens.
+        """)
+
+    response = get_current_chat_client().chat.completions.create(
+        model=_summary_model(model_name),
+        messages=[{"role": "user", "content": f"{prompt}\n\n{transcript}"}],
+        max_tokens=config.CHA_CONTEXT_SUMMARY_MAX_TOKENS,
+    )
+    summary = response.choices[0].message.content
+    if summary:
+        _summary_cache[hashes] = summary
+    return summary
+
+
+def fit_messages(conversation, model_name):
+    """
+    Return the messages to send for this turn and how many of the
+    conversation's messages were left out. The conversation itself is never
+    modified, the full history is still kept and saved.
+    """
+    messages = conversation.messages
+    if not config.CHA_CONTEXT_BUDGET_ENABLED or not messages:
+        return messages, 0
+
+    budget = token_budget(model_name)
+    if budget is None:
+        # NOTE: leaving out history on a guessed window would do more harm than a provider error
+        return messages, 0
+
+    counts = conversation.token_counts()
+    total = sum(counts)
+    if total <= budget:
+        return messages, 0
+
+    summarize = str(config.CHA_CONTEXT_POLICY).lower() == "summarize"
+    if summarize:
+        # NOTE: leave room for the summary that will replace the dropped span
+        budget -= config.CHA_CONTEXT_SUMMARY_MAX_TOKENS
+
+    initial_prompts = [config.INITIAL_PROMPT]
+    if conversation.history:
+        initial_prompts.append(conversation.history[0].get("user"))
+
+    protected = set(
+        range(
+            max(len(messages) - config.CHA_CONTEXT_KEEP_RECENT_MESSAGES, 0),
+            len(messages),
+        )
+    )
+    if messages[0]["content"] in initial_prompts:
+        protected.add(0)
+
+    dropped = []
+    for i in range(len(messages)):
+        if total <= budget:
+            break
+        if i in protected or conversation.is_pinned(i):
+            continue
+        dropped.append(i)
+        total -= counts[i]
+
+    if not dropped:
+        return messages, 0
+
+    dropped_set = set(dropped)
+    kept = [m for i, m in enumerate(messages) if i not in dropped_set]
+
+    if summarize:
+        try:
+            summary = _summarize([messages[i] for i in dropped], model_name)
+        except Exception as e:
+            summary = None
+            if config.CHA_DEBUG_MODE:
+                print(colors.red(f"Failed to summarize older messages: {e}"))
+        if summary:
+            # every message before the first dropped one is kept, so the summary takes its place
+            kept.insert(
+                dropped[0],
+                {
+                    "role": "user",
+                    "content": f"Summary of the earlier part of this conversation:\n{summary}",
+                },
+            )
+
+    return kept, len(dropped)
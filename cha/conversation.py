@@ -0,0 +1,176 @@
+from cha import config, tokenizer
+
+
+class Conversation:
+    """
+    Owns both views of a chat: the history records that get saved to disk and
+    the role/content messages sent to the model. Both lists are mutated in
+    place so existing references (CURRENT_CHAT_HISTORY, tool calls) stay
+    valid. Token counts are cached per message and kept as a running total.
+    """
+
+    def __init__(self, history, model, include_initial_prompt=True):
+        self.history = history
+        self.messages = []
+        self.model = model
+        self.include_initial_prompt = include_initial_prompt
+        self._tokens = []
+        self._pinned = []
+        self._token_cache = {}
+        self._total = 0
+        self._uncounted = 0
+        # NOTE: set to a journal.Journal to log every history change as it happens
+        self.journal = None
+        self.rebuild()
+
+    def _append(self, role, content, pinned=False):
+        self.messages.append({"role": role, "content": content})
+        self._pinned.append(bool(pinned))
+        count = self._token_cache.get(str(content))
+        self._tokens.append(count)
+        if count is None:
+            self._uncounted += 1
+        else:
+            self._total += count
+
+    def rebuild(self):
+        """
+        Rebuild the message list from the history records, cached token
+        counts are reused so this never re-tokenizes known messages
+        """
+        self.messages.clear()
+        self._tokens.clear()
+        self._pinned.clear()
+        self._total = 0
+        self._uncounted = 0
+
+        if self.include_initial_prompt and self.history:
+            initial_prompt = self.history[0].get("user") or config.INITIAL_PROMPT
+            self._append("user", initial_prompt)
+        elif self.include_initial_prompt:
+            self._append("user", config.INITIAL_PROMPT)
+
+        for item in self.history[1:]:
+            if item.get("user"):
+                self._append("user", item["user"], item.get("pinned"))
+            if item.get("bot"):
+                self._append("assistant", item["bot"], item.get("pinned"))
+
+    def reset_messages(self):
+        """
+        Forget everything sent so far except the initial prompt, the history
+        records are left untouched so the session is still saved in full
+        """
+        self.messages.clear()
+        self._tokens.clear()
+        self._pinned.clear()
+        self._total = 0
+        self._uncounted = 0
+        if self.include_initial_prompt:
+            self._append("user", config.INITIAL_PROMPT)
+
+    def add_message(self, role, content):
+        self._append(role, content)
+
+    def pop_message(self):
+        if not self.messages:
+            return None
+        self._pinned.pop()
+        count = self._tokens.pop()
+        if count is None:
+            self._uncounted -= 1
+        else:
+            self._total -= count
+        return self.messages.pop()
+
+    def last_message(self):
+        return self.messages[-1] if self.messages else None
+
+    def add_record(self, record):
+        self.history.append(record)
+        if self.journal is not None:
+            self.journal.append_turn(record)
+
+    def _journal_reset(self):
+        if self.journal is not None:
+            self.journal.reset(self.history)
+
+    def is_pinned(self, index):
+        return self._pinned[index]
+
+    def pin_last_turn(self):
+        """
+        Pin the latest history record so context trimming never drops it, the
+        flag is stored on the record and survives saves and rebuilds
+        """
+        if len(self.history) <= 1:
+            return False
+        record = self.history[-1]
+        record["pinned"] = True
+        self._journal_reset()
+        turn_contents = [record.get("user"), record.get("bot")]
+        for i in range(len(self.messages) - 1, max(len(self.messages) - 3, -1), -1):
+            if self.messages[i]["content"] in turn_contents:
+                self._pinned[i] = True
+        return True
+
+    def replace_history(self, records):
+        self.history.clear()
+        self.history.extend(records)
+        self.rebuild()
+        self._journal_reset()
+
+    def remove_records(self, indices):
+        """
+        Remove history records by index (the initial prompt at index 0 is kept)
+        and return how many were removed
+        """
+        removed = 0
+        for index in sorted(set(indices), reverse=True):
+            if 1 <= index < len(self.history):
+                self.history.pop(index)
+                removed += 1
+        if removed:
+            self.rebuild()
+            self._journal_reset()
+        return removed
+
+    def set_model(self, model, include_initial_prompt=None):
+        if include_initial_prompt is not None:
+            # NOTE: only applies to the next rebuild, the live messages are left as they are
+            self.include_initial_prompt = include_initial_prompt
+        if model != self.model:
+            # NOTE: token counts depend on the model's encoding
+            self.model = model
+            self._token_cache.clear()
+            self._tokens = [None] * len(self.messages)
+            self._total = 0
+            self._uncounted = len(self.messages)
+
+    def token_counts(self):
+        """
+        Per-message token counts, in the same order as the messages
+        """
+        self.token_count()
+        return list(self._tokens)
+
+    def token_count(self):
+        """
+        Token total of the current messages, only messages that were never
+        counted before are tokenized
+        """
+        if self._uncounted:
+            pending = [i for i, count in enumerate(self._tokens) if count is None]
+            contents = [str(self.messages[i]["content"]) for i in pending]
+            new_contents = list(
+                dict.fromkeys(c for c in contents if c not in self._token_cache)
+            )
+            for content, count in zip(
+                new_contents, tokenizer.count_many(new_contents, self.model)
+            ):
+                self._token_cache[content] = count or 0
+            for i, content in zip(pending, contents):
+                self._tokens[i] = self._token_cache[content]
+                self._total += self._tokens[i]
+            self._uncounted = 0
+        return self._total
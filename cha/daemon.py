@@ -0,0 +1,416 @@
+import socket
+import signal
+import struct
+import json
+import time
+import sys
+import os
+
+from cha import config
+
+# NOTE: flipped inside forked workers so a forwarded call never forwards itself again
+_IN_DAEMON_WORKER = False
+
+# flags that need fzf, an editor, audio, or a live prompt, so they always run in-process
+INTERACTIVE_FLAGS = {
+    "-h",
+    "--help",
+    "-a",
+    "--answer",
+    "-t",
+    "--ide",
+    "-x",
+    "--shell",
+    "-hs",
+    "--history",
+    "-r",
+    "--record",
+    "--voice",
+    "-v",
+    "--editor",
+    "-sm",
+    "--select-model",
+    "-i",
+    "--init",
+    "-c",
+    "--continue",
+    "--daemon",
+    "--profile-startup",
+}
+
+# flags that open an fzf picker when they are given without a value
+OPTIONAL_VALUE_FLAGS = {"-p", "--platform", "-d", "--codedump"}
+
+VALUE_FLAGS = {
+    "-l",
+    "--load",
+    "-m",
+    "--model",
+    "-ocr",
+    "--ocr",
+    "-lh",
+    "--load-history",
+    "--batch",
+}
+
+
+def socket_path():
+    return os.path.expanduser(config.CHA_DAEMON_SOCKET_PATH)
+
+
+def pid_path():
+    return socket_path() + ".pid"
+
+
+def is_daemon_worker():
+    return _IN_DAEMON_WORKER
+
+
+def _send_message(conn, message):
+    conn.sendall((json.dumps(message) + "\n").encode("utf-8"))
+
+
+def _scan_args(argv):
+    """
+    Walk the raw argv the way argparse would and report which flags were used,
+    the value given to each, and whether any positional prompt text is present.
+    """
+    flags = {}
+    has_positional = False
+    i = 0
+    while i < len(argv):
+        token = argv[i]
+        if token == "--":
+            has_positional = has_positional or i + 1 < len(argv)
+            break
+        if token.startswith("-") and token != "-":
+            name, _, inline_value = token.partition("=")
+            value = inline_value or None
+            if value is None and name in VALUE_FLAGS | OPTIONAL_VALUE_FLAGS:
+                if i + 1 < len(argv) and not argv[i + 1].startswith("-"):
+                    value = argv[i + 1]
+                    i += 1
+            flags[name] = value
+        else:
+            has_positional = True
+        i += 1
+    return flags, has_positional
+
+
+def is_forwardable(argv, stdin_is_tty):
+    flags, has_positional = _scan_args(argv)
+
+    if any(flag in INTERACTIVE_FLAGS for flag in flags):
+        return False
+
+    for flag in OPTIONAL_VALUE_FLAGS:
+        if flag in flags and flags[flag] is None:
+            return False
+
+    # NOTE: codedump only skips its file picker with "all" or an explicit include list
+    code_dump_value = flags.get("-d") or flags.get("--codedump")
+    if code_dump_value and not (
+        "include:" in code_dump_value or "all" in code_dump_value.split(",")
+    ):
+        return False
+
+    # NOTE: a platform without an explicit model makes cli() open the model picker
+    has_model = "-m" in flags or "--model" in flags
+    platform_value = flags.get("-p") or flags.get("--platform")
+    if not has_model:
+        if platform_value and "|" not in platform_value:
+            return False
+        if not platform_value and config.CHA_CURRENT_PLATFORM_NAME != "openai":
+            return False
+
+    # a tty stdin with no prompt text means an interactive chat session
+    return (
+        has_positional
+        or not stdin_is_tty
+        or any(flag in flags for flag in ("-l", "--load", "--batch"))
+    )
+
+
+def forward(argv):
+    """
+    Hand the invocation to a running daemon. Returns the exit code, or None
+    when there is no daemon to talk to (or the call must run in-process).
+    """
+    if _IN_DAEMON_WORKER or not config.CHA_DAEMON_FORWARDING:
+        return None
+
+    path = socket_path()
+    if not os.path.exists(path):
+        return None
+
+    try:
+        stdin_is_tty = os.isatty(0)
+    except OSError:
+        stdin_is_tty = False
+    if not is_forwardable(argv, stdin_is_tty):
+        return None
+
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(path)
+    except OSError:
+        conn.close()
+        return None
+
+    body = json.dumps(
+        {"argv": list(argv), "cwd": os.getcwd(), "env": dict(os.environ)}
+    ).encode("utf-8")
+
+    worker_pid = None
+
+    def forward_signal(signum, frame):
+        if worker_pid:
+            try:
+                os.kill(worker_pid, signum)
+            except OSError:
+                pass
+
+    previous_handlers = {}
+    try:
+        # NOTE: the caller's stdio is passed as file descriptors so the worker writes straight to this terminal or pipe
+        socket.send_fds(conn, [struct.pack("!I", len(body))], [0, 1, 2])
+        conn.sendall(body)
+
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+            previous_handlers[signum] = signal.signal(signum, forward_signal)
+
+        reader = conn.makefile("rb")
+        exit_code = 1
+        for line in reader:
+            message = json.loads(line)
+            if "pid" in message:
+                worker_pid = message["pid"]
+            elif "exit" in message:
+                exit_code = message["exit"]
+                break
+        return exit_code
+    except OSError:
+        # NOTE: the daemon went away before it took the request, so run in-process
+        return None if worker_pid is None else 1
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        conn.close()
+
+
+def _recv_exact(conn, size, data=b""):
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("client closed the connection")
+        data += chunk
+    return data
+
+
+def _run_worker(conn):
+    global _IN_DAEMON_WORKER
+    _IN_DAEMON_WORKER = True
+
+    header, fds, _, _ = socket.recv_fds(conn, 4, 3)
+    header = _recv_exact(conn, 4, header)
+    request = json.loads(_recv_exact(conn, struct.unpack("!I", header)[0]))
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    for target, fd in zip((0, 1, 2), fds):
+        os.dup2(fd, target)
+        os.close(fd)
+
+    # NOTE: the inherited stdout was opened block buffered while fd 1 was /dev/null, reopen it line buffered on the client's fd
+    sys.stdout = open(
+        1,
+        "w",
+        buffering=1,
+        encoding=sys.stdout.encoding,
+        errors=sys.stdout.errors,
+        closefd=False,
+    )
+
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    sys.argv = ["cha"] + request["argv"]
+
+    # NOTE: picks up an edited config file, it only runs again when its path or mtime changed
+    config.load_external_config()
+
+    _send_message(conn, {"pid": os.getpid()})
+
+    from cha import main
+
+    # NOTE: the warm module was imported when the daemon started, not when this call did
+    main.CURRENT_CHAT_HISTORY[0]["time"] = time.time()
+
+    exit_code = 0
+    try:
+        main.cli()
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            exit_code = e.code
+        elif e.code is not None:
+            exit_code = 1
+    except BaseException:
+        exit_code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+
+    _send_message(conn, {"exit": exit_code})
+    return exit_code
+
+
+def _warm_up():
+    from cha import main, client, tokenizer
+
+    # NOTE: both warm-up threads must be done before forking, a held import or encoding lock would deadlock the workers
+    client.warmup_thread_obj.join()
+    tokenizer.warmup_thread_obj.join()
+    try:
+        client._ensure_openai_module_is_loaded()
+    except SystemExit:
+        pass
+
+
+def serve():
+    path = socket_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    _warm_up()
+
+    if os.path.exists(path):
+        os.unlink(path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # NOTE: the socket is created owner only, a chmod after bind would leave it open to other users for a moment
+    old_umask = os.umask(0o077)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(old_umask)
+    server.listen(64)
+
+    with open(pid_path(), "w") as f:
+        f.write(str(os.getpid()))
+
+    def shutdown(signum, frame):
+        for p in (path, pid_path()):
+            try:
+                os.unlink(p)
+            except OSError:
+                pass
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    # NOTE: workers are reaped automatically, the daemon never waits on them
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    while True:
+        try:
+            conn, _ = server.accept()
+        except InterruptedError:
+            continue
+
+        pid = os.fork()
+        if pid == 0:
+            server.close()
+            exit_code = 1
+            try:
+                exit_code = _run_worker(conn)
+            except BaseException:
+                pass
+            finally:
+                os._exit(exit_code if isinstance(exit_code, int) else 1)
+        conn.close()
+
+
+def running_pid():
+    try:
+        with open(pid_path()) as f:
+            pid = int(f.read().strip())
+        os.kill(pid, 0)
+        return pid
+    except (OSError, ValueError):
+        return None
+
+
+def start():
+    pid = running_pid()
+    if pid:
+        return pid
+
+    # NOTE: finish the background openai import first, forking while it holds the import lock deadlocks the daemon
+    _warm_up()
+
+    pid = os.fork()
+    if pid > 0:
+        os.waitpid(pid, 0)
+        # give the daemon a moment to bind its socket
+        for _ in range(100):
+            if os.path.exists(socket_path()) and running_pid():
+                return running_pid()
+            time.sleep(0.05)
+        return running_pid()
+
+    # NOTE: classic double fork so the daemon is not tied to this terminal
+    os.setsid()
+    if os.fork() > 0:
+        os._exit(0)
+
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.close(devnull)
+
+    try:
+        serve()
+    finally:
+        os._exit(0)
+
+
+def stop():
+    pid = running_pid()
+    if not pid:
+        return False
+    os.kill(pid, signal.SIGTERM)
+    for _ in range(100):
+        if running_pid() is None:
+            break
+        time.sleep(0.05)
+    return True
+
+
+def run_command(action):
+    from cha import colors
+
+    if action == "run":
+        serve()
+    elif action == "start":
+        pid = start()
+        if pid:
+            print(colors.green(f"Cha daemon running (pid {pid})"))
+        else:
+            print(colors.red("Failed to start the cha daemon"))
+    elif action == "stop":
+        if stop():
+            print(colors.yellow("Stopped the cha daemon"))
+        else:
+            print(colors.yellow("The cha daemon is not running"))
+    elif action == "status":
+        pid = running_pid()
+        if pid:
+            print(colors.green(f"Cha daemon running (pid {pid}) on {socket_path()}"))
+        else:
+            print(colors.yellow("The cha daemon is not running"))
@@ -0,0 +1,210 @@
+import time
+import sys
+
+# NOTE: this is the console entry point, its imports stay light so trivial commands never load the llm client stack
+
+TOKEN_COUNT_FLAGS = {"-ct", "--tokens"}
+MODEL_FLAGS = {"-m", "--model"}
+
+
+def print_version(_=None):
+    try:
+        from importlib.metadata import version
+
+        print(f"{version('cha')} (Cha)")
+    except:
+        print("?")
+
+
+def _run_shell(command):
+    from cha import utils
+
+    utils.run_a_shell(command)
+
+
+def search_history(mode):
+    from cha import colors, local
+
+    try:
+        hs_output = local.browse_and_select_history_file(exact_mode=(mode == "exact"))
+        if hs_output and isinstance(hs_output, dict):
+            selected_path = hs_output.get("path")
+            chat_msgs = hs_output.get("chat")
+            if selected_path and chat_msgs:
+                print(colors.magenta(selected_path))
+                local.print_history_browse_and_select_history_file(chat_msgs)
+    except (KeyboardInterrupt, EOFError):
+        print()
+    except Exception as e:
+        print(colors.red(f"Failed to search history: {e}"))
+
+
+def print_token_count(text, content_mode, model_name):
+    """
+    Shared by the fast path and cha.main, prints the -ct report or just the
+    number when stdout is piped
+    """
+    from cha import tokenizer
+
+    try:
+        max_error = 0
+        if content_mode == "FILE":
+            from cha import tokencache
+
+            # NOTE: files are often counted again unchanged, so their counts are cached by content
+            token_count = tokencache.count_texts([text], model_name)[0]
+        else:
+            token_count, max_error = tokenizer.count_with_error(text, model_name)
+    except Exception as e:
+        raise Exception(f"Error counting tokens: {e}")
+    _print_token_report(content_mode, model_name, len(text), token_count, max_error)
+
+
+def _print_token_report(content_mode, model_name, chars, token_count, max_error):
+    from cha import colors
+
+    if token_count is None:
+        raise Exception("Error counting tokens: Failed to calculate token count")
+    if sys.stdout.isatty():
+        print(colors.green("Content Type:"), content_mode)
+        print(colors.green("Selected Model:"), model_name)
+        print(colors.green("Text Length:"), chars, "chars")
+        print(colors.green("Token Count:"), token_count, "tokens")
+        if max_error:
+            print(
+                colors.green("Max Error:"),
+                f"+/- {max_error} tokens (counted in pieces)",
+            )
+    else:
+        print(f"{token_count}")
+
+
+def print_stdin_token_count(model_name):
+    """
+    Count piped stdin block by block without holding it in memory, progress
+    goes to stderr every CHA_TOKEN_COUNT_PROGRESS_SECONDS when it is a terminal
+    """
+    from cha import config, tokenizer
+
+    progress = None
+    interval = config.CHA_TOKEN_COUNT_PROGRESS_SECONDS
+    if interval and sys.stderr.isatty():
+        last_report = [time.monotonic()]
+
+        def progress(tokens, chars):
+            now = time.monotonic()
+            if now - last_report[0] >= interval:
+                last_report[0] = now
+                sys.stderr.write(f"\r{tokens} tokens in {chars} chars...")
+                sys.stderr.flush()
+
+    try:
+        token_count, chars, max_error = tokenizer.count_stream(
+            sys.stdin, model_name, progress=progress
+        )
+    except Exception as e:
+        raise Exception(f"Error counting tokens: {e}")
+    finally:
+        if progress is not None:
+            sys.stderr.write("\r\033[K")
+            sys.stderr.flush()
+    _print_token_report("PIPE", model_name, chars, token_count, max_error)
+
+
+def _count_tokens(value):
+    model_name, strings = value
+
+    if strings:
+        print_token_count(" ".join(strings), "STRING", model_name)
+    elif not sys.stdin.isatty():
+        print_stdin_token_count(model_name)
+    elif sys.stdout.isatty():
+        from cha import colors
+
+        print(
+            colors.red(
+                "Please provide input text, a filepath, or pipe in content for token counting"
+            )
+        )
+
+
+def _token_count_command(argv):
+    from cha import config
+
+    # NOTE: another platform can change the model, so that needs the full cli
+    if config.CHA_CURRENT_PLATFORM_NAME != "openai":
+        return None
+
+    model_name, strings = config.CHA_DEFAULT_MODEL, []
+    i = 0
+    while i < len(argv):
+        token = argv[i]
+        if token in TOKEN_COUNT_FLAGS:
+            pass
+        elif token in MODEL_FLAGS and i + 1 < len(argv):
+            model_name = argv[i + 1]
+            i += 1
+        elif token.startswith("--model="):
+            model_name = token.partition("=")[2]
+        elif token.startswith("-") and token != "-":
+            return None
+        else:
+            strings.append(token)
+        i += 1
+    return _count_tokens, (model_name, strings)
+
+
+def fast_command(argv):
+    """
+    Match argv against the commands that can run without cha.main, returns a
+    (handler, value) pair or None when the full cli is needed
+    """
+    if argv in (["-V"], ["--version"]):
+        return print_version, None
+
+    if len(argv) == 2 and argv[0] in ("-x", "--shell") and argv[1]:
+        return _run_shell, argv[1]
+    if len(argv) == 1 and argv[0].startswith("--shell=") and len(argv[0]) > 8:
+        return _run_shell, argv[0].partition("=")[2]
+
+    if argv and argv[0] in ("-hs", "--history"):
+        if len(argv) == 1:
+            return search_history, "fuzzy"
+        if len(argv) == 2 and argv[1] in ("fuzzy", "exact"):
+            return search_history, argv[1]
+        return None
+
+    if TOKEN_COUNT_FLAGS & set(argv):
+        return _token_count_command(argv)
+
+    return None
+
+
+def cli():
+    argv = sys.argv[1:]
+
+    command = fast_command(argv)
+    if command is not None:
+        handler, value = command
+        try:
+            handler(value)
+        except (KeyboardInterrupt, EOFError):
+            if sys.stdout.isatty():
+                print()
+        except Exception as err:
+            if sys.stdout.isatty():
+                from cha import colors
+
+                print(colors.red(str(err) or "Exited unexpectedly"))
+        return
+
+    from cha import daemon
+
+    # NOTE: hand non-interactive calls to a warm daemon before paying for cha.main
+    exit_code = daemon.forward(argv)
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+    from cha import main
+
+    main.cli()
@@ -0,0 +1,164 @@
+import asyncio
+import sys
+import re
+
+from cha import colors, utils, loading, client, platforms, telemetry
+from cha.stream import stream_chat_turn
+
+
+def parse_targets(spec):
+    """
+    Parse "model_a,platform|model_b,..." into resolved targets
+    """
+    targets = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "|" in part:
+            platform_name, model_name = [p.strip() for p in part.split("|", 1)]
+        else:
+            platform_name, model_name = None, part
+        if not model_name:
+            raise ValueError(f"Missing model name in '{part}'")
+        targets.append(platforms.resolve_target(platform_name, model_name))
+
+    if len(targets) < 2:
+        raise ValueError("Fan-out needs at least two models")
+    return targets
+
+
+def _label(index, target):
+    return f"[{index}] {target['platform']}|{target['model']}"
+
+
+def _stats_text(result):
+    if result.get("error"):
+        return f"failed after {result['seconds']:.2f}s"
+    return telemetry.status_line(result["stats"])
+
+
+async def _run_target(target, messages, echo):
+    try:
+        turn = await stream_chat_turn(
+            client=client.get_async_chat_client(
+                api_key=target["api_key"], base_url=target["base_url"]
+            ),
+            model=target["model"],
+            messages=messages,
+            echo=echo,
+        )
+        turn["error"] = None
+        turn["stats"] = telemetry.turn_stats(turn, target["model"])
+    except Exception as e:
+        turn = {
+            "content": "",
+            "error": str(e) or e.__class__.__name__,
+            "first_token_seconds": None,
+            "seconds": 0,
+        }
+    turn["target"] = target
+    return turn
+
+
+def _print_stats(index, result):
+    if result.get("error"):
+        print(colors.red(f"Error: {result['error']}"))
+    print(colors.yellow(f"{_label(index, result['target'])} {_stats_text(result)}"))
+
+
+async def _fanout(targets, messages):
+    # NOTE: the first model streams live, the rest are shown as blocks in the order they finish
+    tasks = [
+        asyncio.create_task(_run_target(target, messages, echo=(i == 0)))
+        for i, target in enumerate(targets)
+    ]
+    results = [None] * len(targets)
+
+    try:
+        print(colors.magenta(colors.underline(_label(0, targets[0]))))
+        results[0] = await tasks[0]
+        # NOTE: the stream swallows CTRL-C, so check whether this fan-out is being cancelled
+        if asyncio.current_task().cancelling():
+            raise asyncio.CancelledError
+        if results[0]["content"] and not results[0]["content"].endswith("\n"):
+            print()
+        _print_stats(0, results[0])
+
+        pending = {task: i for i, task in enumerate(tasks) if i > 0}
+        while pending:
+            loading.start_loading(f"Waiting for {len(pending)} more", "braille")
+            try:
+                done, _ = await asyncio.wait(
+                    pending.keys(), return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                loading.stop_loading()
+
+            for task in sorted(done, key=lambda t: pending[t]):
+                index = pending.pop(task)
+                results[index] = task.result()
+                print()
+                print(colors.magenta(colors.underline(_label(index, targets[index]))))
+                content = results[index]["content"]
+                if content:
+                    print(colors.green(content.rstrip("\n")))
+                _print_stats(index, results[index])
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return results
+
+
+def _pick_result(results):
+    answered = [(i, r) for i, r in enumerate(results) if r["content"]]
+    if not answered:
+        return None
+    if len(answered) == 1:
+        return answered[0][1]
+
+    options = []
+    for i, result in answered:
+        preview = re.sub(r"\s+", " ", result["content"]).strip()
+        if len(preview) > 80:
+            preview = preview[:77] + "..."
+        options.append(f"{_label(i, result['target'])} {preview}")
+
+    try:
+        selected = utils.run_fzf_ssh_safe(
+            [
+                "fzf",
+                "--reverse",
+                "--height=40%",
+                "--border",
+                "--prompt=Pick the answer to keep in history: ",
+            ],
+            "\n".join(options),
+        )
+    except Exception:
+        return None
+
+    match = re.match(r"\[(\d+)\]", selected or "")
+    if not match:
+        return None
+    return results[int(match.group(1))]
+
+
+def run_fanout(targets, messages):
+    """
+    Send the same messages to every target concurrently and let the user pick
+    the answer that enters the chat history. Returns the picked result or None.
+    """
+    results = client.run_async(_fanout(targets, messages))
+    picked = _pick_result(results)
+    if picked is None:
+        print(colors.yellow("No answer picked, nothing was added to the history"))
+        return None
+    print(
+        colors.magenta(
+            f"Kept {picked['target']['platform']}|{picked['target']['model']}"
+        )
+    )
+    sys.stdout.flush()
+    return picked
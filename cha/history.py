@@ -0,0 +1,663 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import sqlite3
+import gzip
+import json
+import time
+import sys
+import os
+import re
+
+from cha import config
+
+# NOTE: the chats table is the history manifest, one row per saved chat, plus one fts row per turn, a file is re-indexed only when its mtime or size changes
+_SCHEMA_VERSION = 4
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS chats (
+        path TEXT PRIMARY KEY,
+        mtime_ns INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        epoch REAL,
+        title TEXT,
+        file_id TEXT,
+        model TEXT,
+        platform TEXT,
+        turn_count INTEGER,
+        output_tokens INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS chats_epoch ON chats (epoch)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS turns USING fts5(
+        path UNINDEXED,
+        turn UNINDEXED,
+        user,
+        bot,
+        tokenize = 'unicode61'
+    )
+    """,
+)
+
+SNIPPET_TOKENS = 16
+
+# history file suffix for each CHA_HISTORY_COMPRESSION value
+SUFFIXES = {None: ".json", "gzip": ".json.gz", "zstd": ".json.zst"}
+ZSTD_LEVEL = 10
+ZSTD_DICT_SIZE = 112640
+ZSTD_DICT_SAMPLES = 2000
+
+_zstd_dicts = {}
+
+
+def is_history_file(name):
+    return name.endswith(tuple(SUFFIXES.values()))
+
+
+def _zstandard():
+    try:
+        import zstandard
+
+        return zstandard
+    except ImportError:
+        raise Exception(
+            "zstd history files need the zstandard package (pip install zstandard)"
+        )
+
+
+def _zstd_dict_paths():
+    """
+    Trained dictionaries by id, each is kept for good since files compressed
+    with it can only be read with that exact dictionary
+    """
+    paths = {}
+    try:
+        names = os.listdir(config.LOCAL_CHA_CONFIG_HISTORY_DIR)
+    except OSError:
+        return paths
+    for name in names:
+        if name.startswith(".zstd_dict_") and name[11:].isdigit():
+            paths[int(name[11:])] = os.path.join(
+                config.LOCAL_CHA_CONFIG_HISTORY_DIR, name
+            )
+    return paths
+
+
+def _zstd_dict(dict_id=None):
+    """
+    The dictionary with the given id, or the newest one for writing, None
+    when there is none
+    """
+    zstandard = _zstandard()
+    paths = _zstd_dict_paths()
+    if dict_id is None:
+        if not paths:
+            return None
+        dict_id = max(paths, key=lambda i: os.stat(paths[i]).st_mtime_ns)
+    if dict_id not in _zstd_dicts:
+        if dict_id not in paths:
+            raise Exception(f"Missing zstd dictionary {dict_id} for history file")
+        with open(paths[dict_id], "rb") as f:
+            _zstd_dicts[dict_id] = zstandard.ZstdCompressionDict(f.read())
+    return _zstd_dicts[dict_id]
+
+
+def train_zstd_dict(paths):
+    """
+    Train a shared dictionary from a sample of history files, small chats
+    compress much better with it. Returns the new dictionary id or None.
+    """
+    zstandard = _zstandard()
+    samples = []
+    for path in paths[-ZSTD_DICT_SAMPLES:]:
+        try:
+            samples.append(_dump(read_history(path), "zstd"))
+        except Exception:
+            continue
+    try:
+        trained = zstandard.train_dictionary(ZSTD_DICT_SIZE, samples)
+    except zstandard.ZstdError:
+        # NOTE: too few or too small samples, files are compressed without a dictionary
+        return None
+    dict_id = trained.dict_id()
+    path = os.path.join(config.LOCAL_CHA_CONFIG_HISTORY_DIR, f".zstd_dict_{dict_id}")
+    with open(path, "wb") as f:
+        f.write(trained.as_bytes())
+    return dict_id
+
+
+def read_bytes(path):
+    """
+    The raw json bytes of a history file in any of the supported formats
+    """
+    path = str(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".gz"):
+        return gzip.decompress(data)
+    if path.endswith(".zst"):
+        zstandard = _zstandard()
+        dict_id = zstandard.get_frame_parameters(data).dict_id
+        dict_data = _zstd_dict(dict_id) if dict_id else None
+        return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data)
+    return data
+
+
+def read_history(path):
+    return json.loads(read_bytes(path))
+
+
+def _encode(data, compression):
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if compression == "zstd":
+        zstandard = _zstandard()
+        dict_data = _zstd_dict()
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dict_data).compress(
+            data
+        )
+    return data
+
+
+def _compression_for(path):
+    for compression, suffix in SUFFIXES.items():
+        if compression and str(path).endswith(suffix):
+            return compression
+    return None
+
+
+def _dump(content, compression):
+    """
+    History json before compression, plain json stays pretty printed and
+    compressed files are written compact
+    """
+    if compression is None:
+        return json.dumps(content, indent=4).encode("utf-8")
+    return json.dumps(content, separators=(",", ":")).encode("utf-8")
+
+
+def write_history(path, content):
+    """
+    Write a history file in the format its suffix names
+    """
+    compression = _compression_for(path)
+    data = _dump(content, compression)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_encode(data, compression))
+    os.replace(tmp_path, path)
+
+
+def _recompress_file(path, compression):
+    stem = path
+    for suffix in SUFFIXES.values():
+        if path.endswith(suffix):
+            stem = path[: -len(suffix)]
+    new_path = stem + SUFFIXES[compression]
+    stat = os.stat(path)
+    data = _dump(read_history(path), compression)
+
+    tmp_path = f"{new_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_encode(data, compression))
+    # NOTE: the original mtime is kept so recency based features see the same order
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(tmp_path, new_path)
+    if new_path != path:
+        os.remove(path)
+    return stat.st_size, os.stat(new_path).st_size
+
+
+def recompress(compression, workers=None):
+    """
+    Rewrite every history file in the given format (None for plain json) on
+    a thread pool, returns (files, bytes before, bytes after, errors)
+    """
+    history_dir = config.LOCAL_CHA_CONFIG_HISTORY_DIR
+    paths = sorted(
+        os.path.join(history_dir, name)
+        for name in os.listdir(history_dir)
+        if is_history_file(name)
+    )
+    if compression == "zstd" and not _zstd_dict_paths():
+        train_zstd_dict(paths)
+    paths = [path for path in paths if _compression_for(path) != compression]
+
+    # NOTE: gzip and zstd release the gil while compressing, so threads keep every core busy
+    files, before, after, errors = 0, 0, 0, []
+    with ThreadPoolExecutor(workers or os.cpu_count() or 1) as executor:
+        futures = {
+            executor.submit(_recompress_file, path, compression): path for path in paths
+        }
+        for future, path in futures.items():
+            try:
+                old_size, new_size = future.result()
+            except Exception as e:
+                errors.append(f"{os.path.basename(path)}: {e}")
+                continue
+            files += 1
+            before += old_size
+            after += new_size
+
+    try:
+        sync(history_dir)
+    except Exception:
+        pass
+    return files, before, after, errors
+
+
+def run_recompress(compression):
+    """
+    Entry point for --recompress-history
+    """
+    from cha import colors
+
+    if not os.path.isdir(config.LOCAL_CHA_CONFIG_HISTORY_DIR):
+        print(colors.yellow("History directory not found"))
+        return
+    compression = None if compression == "none" else compression
+    if compression == "zstd":
+        try:
+            _zstandard()
+        except Exception as e:
+            print(colors.red(str(e)))
+            return
+    print(
+        colors.magenta(
+            f"Rewriting history files as {SUFFIXES[compression]} on all cores..."
+        )
+    )
+    files, before, after, errors = recompress(compression)
+    for error in errors:
+        print(colors.red(f"Failed to recompress {error}"))
+    print(
+        colors.green(
+            f"Rewrote {files} files, {before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB"
+        )
+    )
+
+
+def index_path():
+    return os.path.join(config.LOCAL_CHA_CONFIG_DIR, "history.db")
+
+
+def _connect():
+    connection = sqlite3.connect(index_path(), timeout=5)
+    connection.execute("PRAGMA journal_mode=WAL")
+    (version,) = connection.execute("PRAGMA user_version").fetchone()
+    if version != _SCHEMA_VERSION:
+        # NOTE: the index only mirrors the history files, an older layout is dropped and the next sync rebuilds it
+        with connection:
+            for table in ("chats", "meta", "turns"):
+                connection.execute(f"DROP TABLE IF EXISTS {table}")
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+    return connection
+
+
+def _one_line(text, limit=None):
+    text = re.sub(r"\s+", " ", str(text or "")).strip()
+    if limit and len(text) > limit:
+        text = text[: limit - 3] + "..."
+    return text
+
+
+def _chat_turns(content):
+    chat = content.get("chat") if isinstance(content, dict) else content
+    if not isinstance(chat, list):
+        return []
+    # the first entry holds the system prompt, it is the same for every chat
+    return [turn for turn in chat[1:] if isinstance(turn, dict)]
+
+
+def _turn_output_tokens(turn):
+    # NOTE: a turn's total_tokens includes the whole prompt it resent, only the answer's own tokens add up across turns
+    stats = turn.get("stats") or {}
+    usage = stats.get("usage") or {}
+    return usage.get("completion_tokens") or stats.get("output_tokens") or 0
+
+
+def _index_content(connection, path, stat, content):
+    turns = _chat_turns(content)
+    info = content if isinstance(content, dict) else {}
+    args = info.get("args") or {}
+    epoch = ((info.get("date") or {}).get("epoch") or {}).get("seconds")
+    if epoch is None:
+        epoch = stat.st_mtime
+    title = _one_line(turns[0].get("user"), 120) if turns else ""
+    last_turn = turns[-1] if turns else {}
+    model = last_turn.get("model") or args.get("model")
+    platform = last_turn.get("platform") or args.get("platform")
+
+    connection.execute("DELETE FROM turns WHERE path = ?", (path,))
+    connection.executemany(
+        "INSERT INTO turns (path, turn, user, bot) VALUES (?, ?, ?, ?)",
+        [
+            (path, i, str(turn.get("user") or ""), str(turn.get("bot") or ""))
+            for i, turn in enumerate(turns)
+        ],
+    )
+    connection.execute(
+        "INSERT OR REPLACE INTO chats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            path,
+            stat.st_mtime_ns,
+            stat.st_size,
+            epoch,
+            title,
+            info.get("id"),
+            str(model) if model else None,
+            str(platform) if platform and platform is not True else None,
+            len(turns),
+            sum(_turn_output_tokens(turn) for turn in turns),
+        ),
+    )
+
+
+def new_file_path(epoch_seconds):
+    """
+    A free cha_hs_<epoch>.json path in the history directory, the epoch is
+    bumped when a file for that second already exists
+    """
+    epoch = int(epoch_seconds)
+    suffix = SUFFIXES.get(config.CHA_HISTORY_COMPRESSION, ".json")
+    while True:
+        path = os.path.join(
+            config.LOCAL_CHA_CONFIG_HISTORY_DIR, f"cha_hs_{epoch}{suffix}"
+        )
+        if not any(
+            os.path.exists(
+                os.path.join(
+                    config.LOCAL_CHA_CONFIG_HISTORY_DIR, f"cha_hs_{epoch}{other}"
+                )
+            )
+            for other in SUFFIXES.values()
+        ):
+            return path
+        epoch += 1
+
+
+def save_chat(chat, args=None, config_values=None, epoch_seconds=None):
+    """
+    Write a chat to a new history file and index it, returns the file path.
+    The config is stored as a shared snapshot that the file names by hash,
+    config_values defaults to the current config.
+    """
+    from importlib.metadata import version
+    from cha import snapshot
+    import uuid
+
+    try:
+        version_id = str(version("cha"))
+    except:
+        version_id = "?"
+
+    if epoch_seconds is None:
+        epoch_seconds = time.time()
+
+    history_save = {
+        "chat": chat,
+        "id": str(uuid.uuid4()),
+        "version": version_id,
+        "date": {
+            "epoch": {"seconds": epoch_seconds},
+            "utc": f"{datetime.fromtimestamp(epoch_seconds, tz=timezone.utc)} UTC",
+        },
+        "args": args or {},
+        "config_hash": snapshot.store(config_values),
+    }
+
+    file_path = new_file_path(epoch_seconds)
+    write_history(file_path, history_save)
+
+    try:
+        index_file(file_path, history_save)
+    except Exception:
+        # NOTE: the next history search backfills anything missed here
+        pass
+    return file_path
+
+
+def index_file(path, content=None):
+    """
+    Add or refresh one history file in the index, content can be passed when
+    the caller already has it in memory
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    if content is None:
+        content = read_history(path)
+    connection = _connect()
+    try:
+        with connection:
+            _index_content(connection, path, stat, content)
+    finally:
+        connection.close()
+
+
+def sync(history_dir=None):
+    """
+    Backfill the index from the history directory, new files and files whose
+    mtime or size changed are indexed and deleted ones are dropped. Unchanged
+    files are only stat'ed. Returns the number of files indexed.
+    """
+    history_dir = os.path.abspath(history_dir or config.LOCAL_CHA_CONFIG_HISTORY_DIR)
+
+    paths = {}
+    for entry in os.scandir(history_dir):
+        if entry.is_file() and is_history_file(entry.name):
+            paths[os.path.abspath(entry.path)] = entry.stat()
+
+    connection = _connect()
+    try:
+        known = {
+            path: (mtime_ns, size)
+            for path, mtime_ns, size in connection.execute(
+                "SELECT path, mtime_ns, size FROM chats"
+            )
+            if os.path.dirname(path) == history_dir
+        }
+        indexed = 0
+        with connection:
+            for path in set(known) - set(paths):
+                connection.execute("DELETE FROM turns WHERE path = ?", (path,))
+                connection.execute("DELETE FROM chats WHERE path = ?", (path,))
+            for path, stat in paths.items():
+                if known.get(path) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                try:
+                    content = read_history(path)
+                except Exception:
+                    continue
+                _index_content(connection, path, stat, content)
+                indexed += 1
+        return indexed
+    finally:
+        connection.close()
+
+
+def _match_query(query, exact):
+    """
+    Turn what the user typed into an fts5 query, exact mode matches the
+    whole text as a phrase and fuzzy mode matches every word as a prefix
+    """
+    if exact:
+        text = query.strip()
+        if len(text) > 1 and text[0] == text[-1] == "'":
+            text = text[1:-1]
+        return '"' + text.replace('"', '""') + '"'
+    words = re.findall(r"\w+", query, flags=re.UNICODE)
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+
+
+_MANIFEST_COLUMNS = "chats.path, chats.epoch, chats.title, chats.model, chats.turn_count, chats.output_tokens, chats.size"
+
+
+def list_chats(limit=200):
+    """
+    The newest chats from the manifest as dicts, no history file is opened
+    """
+    connection = _connect()
+    try:
+        rows = connection.execute(
+            f"SELECT {_MANIFEST_COLUMNS}, '' FROM chats ORDER BY epoch DESC LIMIT ?",
+            (limit,),
+        )
+        return [_manifest_entry(row) for row in rows]
+    finally:
+        connection.close()
+
+
+def _manifest_entry(row):
+    path, epoch, title, model, turns, output_tokens, size, snippet = row
+    return {
+        "path": path,
+        "epoch": epoch,
+        "title": title,
+        "model": model,
+        "turns": turns,
+        "output_tokens": output_tokens,
+        "size": size,
+        "snippet": _one_line(snippet),
+    }
+
+
+def _newest_manifest_path(history_dir):
+    connection = _connect()
+    try:
+        rows = connection.execute("SELECT path FROM chats ORDER BY epoch DESC")
+        for (path,) in rows:
+            if os.path.dirname(path) == history_dir and os.path.basename(
+                path
+            ).startswith("cha_hs_"):
+                return path
+        return None
+    finally:
+        connection.close()
+
+
+def latest_path(history_dir=None):
+    """
+    The newest cha_hs_ history file according to the manifest, None when
+    there is none. save_chat keeps the manifest current, so the directory is
+    not scanned.
+    """
+    history_dir = os.path.abspath(history_dir or config.LOCAL_CHA_CONFIG_HISTORY_DIR)
+    try:
+        path = _newest_manifest_path(history_dir)
+        if path is None or not os.path.exists(path):
+            # NOTE: a new or rebuilt index, or a file deleted behind its back, is the only case that scans the directory
+            sync(history_dir)
+            path = _newest_manifest_path(history_dir)
+        return path
+    except sqlite3.Error:
+        # NOTE: without a usable index the newest file is found from the file names
+        names = [
+            name
+            for name in os.listdir(history_dir)
+            if name.startswith("cha_hs_") and is_history_file(name)
+        ]
+        if not names:
+            return None
+        latest = max(names, key=lambda n: int(re.search(r"cha_hs_(\d+)", n).group(1)))
+        return os.path.join(history_dir, latest)
+
+
+def search(query, exact=False, limit=200):
+    """
+    Ranked matches as manifest dicts with a snippet, one per chat with the
+    snippet of its best matching turn. An empty query lists the newest chats.
+    """
+    match = _match_query(query, exact) if query.strip() else ""
+    if not match:
+        return list_chats(limit)
+
+    connection = _connect()
+    try:
+        rows = connection.execute(
+            f"""
+            SELECT {_MANIFEST_COLUMNS},
+                snippet(turns, -1, '\033[1;33m', '\033[0m', '...', {SNIPPET_TOKENS})
+            FROM turns JOIN chats ON chats.path = turns.path
+            WHERE turns MATCH ?
+            ORDER BY bm25(turns)
+            """,
+            (match,),
+        )
+        results, seen = [], set()
+        for row in rows:
+            if row[0] in seen:
+                continue
+            seen.add(row[0])
+            results.append(_manifest_entry(row))
+            if len(results) >= limit:
+                break
+        return results
+    except sqlite3.OperationalError:
+        # NOTE: a half typed query can be invalid fts syntax, that just shows no matches
+        return []
+    finally:
+        connection.close()
+
+
+def format_results(results):
+    """
+    One fzf line per chat, the path is the first tab separated field and is
+    hidden from the list
+    """
+    lines = []
+    for entry in results:
+        try:
+            date = datetime.fromtimestamp(
+                float(entry["epoch"]), tz=timezone.utc
+            ).strftime("%Y-%m-%d %H:%M")
+        except (TypeError, ValueError):
+            date = "?"
+        about = f"{entry['model'] or '?'} {entry['turns'] or 0} turns"
+        if entry["output_tokens"]:
+            about += f" {entry['output_tokens']} output tokens"
+        lines.append(
+            f"{entry['path']}\t{date}\t{about}\t{entry['snippet'] or entry['title']}"
+        )
+    return "\n".join(lines)
+
+
+def print_preview(path):
+    try:
+        content = read_history(path)
+    except Exception as e:
+        print(f"Failed to read {path}: {e}")
+        return
+    for turn in _chat_turns(content):
+        print(f"User: {turn.get('user')}\n{turn.get('bot')}\n")
+
+
+def main(argv=None):
+    """
+    Called by fzf's reload and preview bindings, and for a manual reindex
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else ""
+    if command in ("search", "exact"):
+        query = argv[1] if len(argv) > 1 else ""
+        print(format_results(search(query, exact=(command == "exact"))))
+    elif command == "preview" and len(argv) > 1:
+        print_preview(argv[1])
+    elif command == "list":
+        results = list_chats()
+        if not results or not all(os.path.exists(r["path"]) for r in results):
+            sync()
+            results = list_chats()
+        print(format_results(results))
+    elif command == "sync":
+        print(f"Indexed {sync()} history files")
+    else:
+        print(
+            "usage: python -m cha.history [search|exact QUERY | preview PATH | list | sync]"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
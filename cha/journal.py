@@ -0,0 +1,136 @@
+import json
+import time
+import os
+
+from cha import config
+
+# NOTE: a journal is one jsonl file per running session, a "start" record with the chat it began with, then a "turn" record per finished turn or a "reset" record with the whole chat after an edit
+
+
+def journal_dir():
+    return os.path.join(config.LOCAL_CHA_CONFIG_DIR, "journal")
+
+
+class Journal:
+    """
+    Append-only log of the current session's history, written as each turn
+    completes so a crash loses at most the turn in flight. Writes are flushed
+    right away and fsynced at most every CHA_HISTORY_JOURNAL_FSYNC_SECONDS.
+    """
+
+    def __init__(self, chat, args=None):
+        os.makedirs(journal_dir(), exist_ok=True)
+        self.path = os.path.join(journal_dir(), f"{os.getpid()}_{time.time_ns()}.jsonl")
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.last_sync = 0
+        self.changed = False
+        self._write(
+            {"op": "start", "time": time.time(), "args": args or {}, "chat": chat}
+        )
+
+    def _write(self, record):
+        if self.file is None:
+            return
+        self.file.write(
+            json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str)
+            + "\n"
+        )
+        self.file.flush()
+        now = time.monotonic()
+        if now - self.last_sync >= config.CHA_HISTORY_JOURNAL_FSYNC_SECONDS:
+            os.fsync(self.file.fileno())
+            self.last_sync = now
+
+    def append_turn(self, record):
+        self.changed = True
+        self._write({"op": "turn", "record": record})
+
+    def reset(self, chat):
+        self.changed = True
+        self._write({"op": "reset", "chat": chat})
+
+    def close(self, remove=True):
+        """
+        Stop journaling, the file is removed once the session was saved as a
+        regular history file
+        """
+        if self.file is None:
+            return
+        self.file.close()
+        self.file = None
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+def replay(path):
+    """
+    Rebuild (chat, args, start time, changed) from a journal file, a torn last
+    line from a crash mid-write is ignored
+    """
+    chat, args, started, changed = [], {}, None, False
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            op = record.get("op")
+            if op == "start":
+                chat = list(record.get("chat") or [])
+                args = record.get("args") or {}
+                started = record.get("time")
+            elif op == "turn":
+                chat.append(record.get("record"))
+                changed = True
+            elif op == "reset":
+                chat = list(record.get("chat") or [])
+                changed = True
+    return chat, args, started, changed
+
+
+def _owner_is_alive(file_name):
+    try:
+        pid = int(file_name.split("_", 1)[0])
+        os.kill(pid, 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        # the pid exists but belongs to another user
+        pass
+    return True
+
+
+def recover():
+    """
+    Compact journals left behind by crashed sessions into history files,
+    returns the paths of the recovered history files
+    """
+    from cha import history
+
+    try:
+        names = sorted(os.listdir(journal_dir()))
+    except OSError:
+        return []
+
+    recovered = []
+    for name in names:
+        if not name.endswith(".jsonl") or _owner_is_alive(name):
+            continue
+        path = os.path.join(journal_dir(), name)
+        try:
+            chat, args, started, changed = replay(path)
+            if changed and len(chat) > 1:
+                last_time = max(
+                    [t.get("time") or 0 for t in chat if isinstance(t, dict)]
+                    + [started or 0]
+                )
+                recovered.append(
+                    history.save_chat(chat, args=args, epoch_seconds=last_time)
+                )
+            os.remove(path)
+        except (OSError, ValueError, TypeError):
+            continue
+    return recovered
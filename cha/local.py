@@ -173,14 +173,59 @@ def execute_tool(tool_data, chat_history=None, piped_question=None):
 
 
 def read_json(path):
+    if str(path).endswith((".gz", ".zst")):
+        from cha import history
+
+        # NOTE: compressed history files are decoded by the history module
+        return history.read_history(path)
     with open(str(path)) as file:
         content = json.load(file)
     return content
 
 
+def _select_history_path_with_index(history_dir, exact_mode):
+    """
+    Let fzf query the history index on every keystroke instead of piping it
+    the whole corpus, returns the selected path or None
+    """
+    from cha import history, utils
+    import shlex
+    import sys
+
+    history.sync(history_dir)
+
+    history_command = f"{shlex.quote(sys.executable)} -m cha.history"
+    search_command = "exact" if exact_mode else "search"
+    header_text = "{} | [Shift↑/↓] [ESC] [ENTER]".format(
+        "EXACT (use 'query' for literal)" if exact_mode else "FUZZY"
+    )
+    fzf_command = [
+        "fzf",
+        "--ansi",
+        "--disabled",
+        "--delimiter",
+        "\t",
+        "--with-nth",
+        "2..",
+        "--bind",
+        f"change:reload:{history_command} {search_command} {{q}}",
+        "--preview",
+        f"{history_command} preview {{1}} | bat --color=always --style=numbers --pager=never",
+        "--preview-window=right,60%,wrap",
+        "--header",
+        header_text,
+    ]
+
+    fzf_result = utils.run_fzf_ssh_safe(
+        fzf_command, history.format_results(history.search(""))
+    )
+    if not fzf_result or not fzf_result.strip():
+        return None
+    return fzf_result.strip().split("\t", 1)[0]
+
+
 def browse_and_select_history_file(exact_mode=False):
-    from cha import utils
-    import glob
+    import sqlite3
 
     history_dir = os.path.join(os.environ["HOME"], ".cha", "history")
     if not os.path.isdir(history_dir):
@@ -188,19 +233,51 @@ def browse_and_select_history_file(exact_mode=False):
 
     selected_path = None
     try:
-        json_files = glob.glob(os.path.join(history_dir, "*.json"))
+        selected_path = _select_history_path_with_index(history_dir, exact_mode)
+    except sqlite3.Error:
+        # NOTE: without a usable index (e.g. sqlite built without fts5) every line is piped to fzf instead
+        selected_path = _select_history_path_with_rg(history_dir, exact_mode)
+    except (subprocess.CalledProcessError, KeyboardInterrupt):
+        return None
+    except Exception:
+        return None
+
+    if not selected_path or not os.path.exists(selected_path):
+        return None
+
+    try:
+        file_content = read_json(selected_path)
+        chat_content = file_content
+        if file_content.get("chat") != None:
+            chat_content = file_content.get("chat")
+        return {"path": selected_path, "content": file_content, "chat": chat_content}
+    except Exception:
+        return None
+
+
+def _select_history_path_with_rg(history_dir, exact_mode):
+    from cha import history, utils
+    import shlex
+    import sys
+
+    selected_path = None
+    try:
+        json_files = [
+            name for name in os.listdir(history_dir) if history.is_history_file(name)
+        ]
         if not json_files:
             return None
 
         rg_command = [
             "rg",
+            "--search-zip",
             "--line-number",
             "--color=always",
             "",
-            "--glob",
-            "*.json",
-            history_dir,
         ]
+        for suffix in history.SUFFIXES.values():
+            rg_command.extend(["--glob", f"*{suffix}"])
+        rg_command.append(history_dir)
 
         header_text = "{} | [Shift↑/↓] [ESC] [ENTER]".format(
             "EXACT (use 'query' for literal)" if exact_mode else "FUZZY"
@@ -211,7 +288,7 @@ def browse_and_select_history_file(exact_mode=False):
             "--delimiter",
             ":",
             "--preview",
-            "jq -r '.chat[] | \"User: \\(.user)\\n\\(.bot)\\n\"' {1} | bat --color=always --style=numbers --pager=never",
+            f"{shlex.quote(sys.executable)} -m cha.history preview {{1}} | bat --color=always --style=numbers --pager=never",
             "--preview-window=right,60%,wrap",
             "--header",
             header_text,
@@ -238,17 +315,7 @@ def browse_and_select_history_file(exact_mode=False):
     except Exception:
         return None
 
-    if not selected_path or not os.path.exists(selected_path):
-        return None
-
-    try:
-        file_content = read_json(selected_path)
-        chat_content = file_content
-        if file_content.get("chat") != None:
-            chat_content = file_content.get("chat")
-        return {"path": selected_path, "content": file_content, "chat": chat_content}
-    except Exception:
-        return None
+    return selected_path
 
 
 def print_history_browse_and_select_history_file(chat, include_timestamp=True):
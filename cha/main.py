@@ -10,7 +10,20 @@ import os
 import re
 
 try:
-    from cha import colors, utils, config, loading, platforms
+    from cha import (
+        colors,
+        utils,
+        config,
+        loading,
+        platforms,
+        stream,
+        daemon,
+        dispatch,
+        cache,
+        context,
+        telemetry,
+    )
+    from cha.conversation import Conversation
     from cha.client import (
         get_current_chat_client,
         set_current_chat_client,
@@ -32,6 +45,7 @@ CURRENT_CHAT_HISTORY = [
 # track visited directories for exit display
 VISITED_DIRECTORIES = []
 HISTORY_MODIFIED = False
+JOURNAL = None
 
 
 def format_visited_directories(directories):
@@ -123,7 +137,7 @@ def get_help_options():
     )
     help_options.append(f"{config.TEXT_EDITOR_INPUT_MODE} - Text-editor input mode")
     help_options.append(
-        f"{config.SWITCH_MODEL_TEXT} - Switch between models during a session"
+        f"{config.SWITCH_MODEL_TEXT} - Switch between models during a session (a,b or platform|model,... to compare)"
     )
     help_options.append(
         f"{config.SWITCH_PLATFORM_TEXT} - Switch between platforms during a session"
@@ -144,6 +158,9 @@ def get_help_options():
     help_options.append(
         f"{config.CHANGE_DIRECTORY_ALIAS} - Navigate and change cha's current directory"
     )
+    help_options.append(
+        f"{config.PIN_CONTEXT_ALIAS} - Pin the last chat so it is never trimmed from context"
+    )
     help_options.append(f"{config.SKIP_SEND_TEXT} - Skip sending current input")
     help_options.append(f"{config.HELP_PRINT_OPTIONS_KEY} - List all options")
 
@@ -359,7 +376,13 @@ def title_print(selected_model):
             print(colors.yellow(f"- {option}"))
 
 
-def chatbot(selected_model, print_title=True, filepath=None, content_string=None):
+def chatbot(
+    selected_model,
+    print_title=True,
+    filepath=None,
+    content_string=None,
+    use_cache=False,
+):
     global CURRENT_CHAT_HISTORY, HISTORY_MODIFIED
 
     output_is_piped = not sys.stdout.isatty()
@@ -368,27 +391,16 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
     auto_scrape_detection_mode = False
 
     # openai's o-models don't accept system prompts
-    if len(CURRENT_CHAT_HISTORY) > 1:
-        messages = []
-        if not reasoning_model:
-            # the first item is the initial prompt.
-            if CURRENT_CHAT_HISTORY and CURRENT_CHAT_HISTORY[0].get("user"):
-                messages.append(
-                    {"role": "user", "content": CURRENT_CHAT_HISTORY[0]["user"]}
-                )
-
-        for item in CURRENT_CHAT_HISTORY[1:]:
-            if item.get("user"):
-                messages.append({"role": "user", "content": item["user"]})
-            if item.get("bot"):
-                messages.append({"role": "assistant", "content": item["bot"]})
-    else:
-        messages = (
-            []
-            if reasoning_model
-            else [{"role": "user", "content": config.INITIAL_PROMPT}]
-        )
+    conversation = Conversation(
+        CURRENT_CHAT_HISTORY,
+        model=selected_model,
+        include_initial_prompt=not reasoning_model,
+    )
+    conversation.journal = JOURNAL
+    messages = conversation.messages
     multi_line_input = False
+    last_trimmed_count = 0
+    fanout_targets = []
 
     if filepath or content_string:
         if filepath:
@@ -427,7 +439,7 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
         else:
             content = content_string
 
-        messages.append({"role": "user", "content": content})
+        conversation.add_message("user", content)
         single_response = True
 
     else:
@@ -466,32 +478,7 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
 
                 selected_indices = backtrack_history(CURRENT_CHAT_HISTORY)
                 if selected_indices is not None:
-                    original_length = len(CURRENT_CHAT_HISTORY)
-                    selected_indices = sorted(selected_indices, reverse=True)
-
-                    for index in selected_indices:
-                        if 1 <= index < len(CURRENT_CHAT_HISTORY):
-                            CURRENT_CHAT_HISTORY.pop(index)
-
-                    messages.clear()
-                    if not reasoning_model:
-                        if CURRENT_CHAT_HISTORY and CURRENT_CHAT_HISTORY[0].get("user"):
-                            messages.append(
-                                {
-                                    "role": "user",
-                                    "content": CURRENT_CHAT_HISTORY[0]["user"],
-                                }
-                            )
-
-                    for item in CURRENT_CHAT_HISTORY[1:]:
-                        if item.get("user"):
-                            messages.append({"role": "user", "content": item["user"]})
-                        if item.get("bot"):
-                            messages.append(
-                                {"role": "assistant", "content": item["bot"]}
-                            )
-
-                    num_removed = original_length - len(CURRENT_CHAT_HISTORY)
+                    num_removed = conversation.remove_records(selected_indices)
                     if num_removed > 0:
                         HISTORY_MODIFIED = True
                         chat_word = "chat" if num_removed == 1 else "chats"
@@ -548,26 +535,8 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
                     )
                     if history_updated:
                         HISTORY_MODIFIED = True
-                        messages.clear()
-                        if not reasoning_model:
-                            if CURRENT_CHAT_HISTORY and CURRENT_CHAT_HISTORY[0].get(
-                                "user"
-                            ):
-                                messages.append(
-                                    {
-                                        "role": "user",
-                                        "content": CURRENT_CHAT_HISTORY[0]["user"],
-                                    }
-                                )
-                        for item in CURRENT_CHAT_HISTORY[1:]:
-                            if item.get("user"):
-                                messages.append(
-                                    {"role": "user", "content": item["user"]}
-                                )
-                            if item.get("bot"):
-                                messages.append(
-                                    {"role": "assistant", "content": item["bot"]}
-                                )
+                        # NOTE: the editor changed the records in place, replacing them with themselves rebuilds and journals them
+                        conversation.replace_history(list(CURRENT_CHAT_HISTORY))
                 except (KeyboardInterrupt, EOFError):
                     continue
                 except SystemExit:
@@ -596,19 +565,45 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
                 if len(parts) == 1:
                     new_selected_model = platforms.list_models()
                     if new_selected_model:
+                        fanout_targets = []
                         selected_model = new_selected_model
                         print(
                             f"{colors.magenta(config.CHA_CURRENT_PLATFORM_NAME)} {colors.yellow(selected_model)}"
                         )
                         reasoning_model = utils.is_slow_model(selected_model)
+                        conversation.set_model(
+                            selected_model, include_initial_prompt=not reasoning_model
+                        )
+
+                elif "," in parts[1]:
+                    from cha import fanout
+
+                    try:
+                        fanout_targets = fanout.parse_targets(parts[1])
+                        print(
+                            colors.magenta("Fan-out to")
+                            + " "
+                            + colors.yellow(
+                                ", ".join(
+                                    f"{t['platform']}|{t['model']}"
+                                    for t in fanout_targets
+                                )
+                            )
+                        )
+                    except ValueError as e:
+                        print(colors.red(f"Failed to set up fan-out: {e}"))
 
                 else:
                     # NOTE: unsafe but faster direct model switching
+                    fanout_targets = []
                     selected_model = parts[1].strip()
                     print(
                         f"{colors.magenta(config.CHA_CURRENT_PLATFORM_NAME)} {colors.yellow(selected_model)}"
                     )
                     reasoning_model = utils.is_slow_model(selected_model)
+                    conversation.set_model(
+                        selected_model, include_initial_prompt=not reasoning_model
+                    )
 
                 continue
 
@@ -629,7 +624,12 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
 
                             set_current_chat_client(API_KEY_VALUE, BASE_URL_VALUE)
                             config.CHA_CURRENT_PLATFORM_NAME = platform_name
+                            fanout_targets = []
                             reasoning_model = utils.is_slow_model(selected_model)
+                            conversation.set_model(
+                                selected_model,
+                                include_initial_prompt=not reasoning_model,
+                            )
 
                             print(
                                 f"{colors.magenta(platform_name)} {colors.yellow(selected_model)}"
@@ -666,7 +666,12 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
 
                             set_current_chat_client(API_KEY_VALUE, BASE_URL_VALUE)
                             config.CHA_CURRENT_PLATFORM_NAME = platform_name
+                            fanout_targets = []
                             reasoning_model = utils.is_slow_model(selected_model)
+                            conversation.set_model(
+                                selected_model,
+                                include_initial_prompt=not reasoning_model,
+                            )
 
                             print(
                                 f"{colors.magenta(platform_name)} {colors.yellow(selected_model)}"
@@ -693,7 +698,7 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
                     if recorded_text:
                         print(colors.blue("User:"), colors.white(recorded_text))
                         message = recorded_text
-                        messages.append({"role": "user", "content": message})
+                        conversation.add_message("user", message)
                     else:
                         continue
                 except Exception as e:
@@ -724,6 +729,14 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
                 handle_clipboard_copy(CURRENT_CHAT_HISTORY)
                 continue
 
+            elif message.strip() == config.PIN_CONTEXT_ALIAS:
+                if conversation.pin_last_turn():
+                    HISTORY_MODIFIED = True
+                    print(colors.yellow("Pinned the last chat to the context"))
+                else:
+                    print(colors.yellow("No chat to pin"))
+                continue
+
             elif os.path.isdir(config.LOCAL_CHA_CONFIG_HISTORY_DIR) and (
                 message.strip().lower() == config.LOAD_HISTORY_TRIGGER
                 or message.strip().lower().startswith(config.LOAD_HISTORY_TRIGGER + " ")
@@ -752,23 +765,8 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
                     print(colors.magenta(selected_path))
                     local.print_history_browse_and_select_history_file(chat_msgs)
 
-                    CURRENT_CHAT_HISTORY.clear()
-                    CURRENT_CHAT_HISTORY.extend(chat_msgs)
+                    conversation.replace_history(chat_msgs)
                     HISTORY_MODIFIED = False
-
-                    messages.clear()
-                    if not reasoning_model:
-                        messages.append(
-                            {"role": "user", "content": config.INITIAL_PROMPT}
-                        )
-
-                    for item in chat_msgs[1:]:
-                        if item.get("user"):
-                            messages.append({"role": "user", "content": item["user"]})
-                        if item.get("bot"):
-                            messages.append(
-                                {"role": "assistant", "content": item["bot"]}
-                            )
                 except (KeyboardInterrupt, EOFError):
                     print()
                 except Exception as e:
@@ -789,11 +787,7 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
                 try:
                     confirmation = input(colors.yellow("Clear History [y/N]? "))
                     if confirmation.lower() == "y":
-                        messages = (
-                            []
-                            if reasoning_model
-                            else [{"role": "user", "content": config.INITIAL_PROMPT}]
-                        )
+                        conversation.reset_messages()
                     else:
                         print(colors.red("Canceled clearing chat history"))
                 except (KeyboardInterrupt, EOFError):
@@ -841,10 +835,8 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
                     else:
                         tool_result = tool_call_output["result"]
                         if len(str(tool_result)) > 0:
-                            messages.append(
-                                {"role": "assistant", "content": tool_result}
-                            )
-                            CURRENT_CHAT_HISTORY.append(
+                            conversation.add_message("assistant", tool_result)
+                            conversation.add_record(
                                 {
                                     "time": time.time(),
                                     "user": message,
@@ -883,7 +875,7 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
 
                     if message != None:
                         print(colors.green(f"Scraped content added to chat history"))
-                        messages.append({"role": "user", "content": message})
+                        conversation.add_message("user", message)
                     continue
                 else:
                     auto_scrape_detection_mode = not auto_scrape_detection_mode
@@ -1042,8 +1034,8 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
                     get_current_chat_client(), simple=True
                 )
                 if message != None:
-                    messages.append({"role": "user", "content": message})
-                    CURRENT_CHAT_HISTORY.append(
+                    conversation.add_message("user", message)
+                    conversation.add_record(
                         {
                             "time": time.time(),
                             "user": message,
@@ -1063,8 +1055,8 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
                     get_current_chat_client(), simple=False
                 )
                 if message != None:
-                    messages.append({"role": "user", "content": message})
-                    CURRENT_CHAT_HISTORY.append(
+                    conversation.add_message("user", message)
+                    conversation.add_record(
                         {
                             "time": time.time(),
                             "user": message,
@@ -1106,8 +1098,8 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
                             )
                             print(colors.magenta(f"{compressed_tokens} Total Tokens"))
 
-                        messages.append({"role": "user", "content": report})
-                        CURRENT_CHAT_HISTORY.append(
+                        conversation.add_message("user", report)
+                        conversation.add_record(
                             {
                                 "time": time.time(),
                                 "user": report,
@@ -1137,7 +1129,7 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
 
                     if message != None:
                         print(colors.green(f"Scraped content added to chat history"))
-                        messages.append({"role": "user", "content": message})
+                        conversation.add_message("user", message)
                     continue
 
             # check for quick search command
@@ -1177,9 +1169,9 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
                             user_input_mode=True,
                         )
 
-                    messages.append({"role": "user", "content": message})
+                    conversation.add_message("user", message)
 
-                    CURRENT_CHAT_HISTORY.append(
+                    conversation.add_record(
                         {
                             "time": time.time(),
                             "user": "",
@@ -1204,7 +1196,7 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
                 continue
 
             # add user's message
-            messages.append({"role": "user", "content": message})
+            conversation.add_message("user", message)
 
         # prepare a chat record for local usage
         obj_chat_history = {
@@ -1215,17 +1207,76 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
             "model": selected_model,
         }
 
+        # NOTE: the full history is kept, only the payload is trimmed to the context budget
+        send_messages, trimmed_count = context.fit_messages(
+            conversation, selected_model
+        )
+        if trimmed_count and trimmed_count != last_trimmed_count:
+            if not output_is_piped:
+                print(
+                    colors.yellow(
+                        f"Context budget reached, left out {trimmed_count} older messages"
+                    )
+                )
+        last_trimmed_count = trimmed_count
+
+        cache_key = None
+        cached_response = None
+        if use_cache and single_response:
+            cache_key = cache.make_key(
+                config.CHA_CURRENT_PLATFORM_NAME, selected_model, send_messages
+            )
+            cached_response = cache.get(cache_key)
+        response_complete = True
+
         # attempt to send the user's prompt to the selected model
         try:
-            if reasoning_model:
+            if cached_response is not None:
+                full_response = cached_response
+                if output_is_piped:
+                    sys.stdout.write(full_response)
+                else:
+                    sys.stdout.write(colors.green(full_response))
+                sys.stdout.flush()
+                obj_chat_history["bot"] = full_response
+
+            elif fanout_targets and not single_response:
+                from cha import fanout
+
+                picked = fanout.run_fanout(fanout_targets, send_messages)
+                if picked is None:
+                    raise KeyboardInterrupt
+                full_response = picked["content"]
+                obj_chat_history["bot"] = full_response
+                obj_chat_history["platform"] = picked["target"]["platform"]
+                obj_chat_history["model"] = picked["target"]["model"]
+                obj_chat_history["stats"] = picked["stats"]
+
+            elif reasoning_model:
                 if not output_is_piped:
                     loading.start_loading("Thinking", "braille")
+                started_at, start_time = time.time(), time.monotonic()
                 response = get_current_chat_client().chat.completions.create(
-                    model=selected_model, messages=messages
+                    model=selected_model, messages=send_messages
                 )
                 if not output_is_piped:
                     loading.stop_loading()
                 full_response = response.choices[0].message.content
+                obj_chat_history["stats"] = telemetry.turn_stats(
+                    {
+                        "started_at": started_at,
+                        "content": full_response,
+                        "first_token_seconds": None,
+                        "seconds": time.monotonic() - start_time,
+                        "chunks": None,
+                        "usage": (
+                            response.usage.model_dump(exclude_none=True)
+                            if response.usage
+                            else None
+                        ),
+                    },
+                    selected_model,
+                )
                 if output_is_piped:
                     print(full_response)
                 else:
@@ -1233,47 +1284,68 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
                 obj_chat_history["bot"] = full_response
 
             else:
-                response = get_current_chat_client().chat.completions.create(
-                    model=selected_model, messages=messages, stream=True
+                turn = stream.run_chat_turn(
+                    model=selected_model,
+                    messages=send_messages,
+                    output_is_piped=output_is_piped,
                 )
-                full_response = ""
-                try:
-                    error_count = 0
-                    for chunk in response:
-                        try:
-                            chunk_message = chunk.choices[0].delta.content
-                        except:
-                            error_count += 1
-                            if error_count > config.CHA_STREAMING_ERROR_LIMIT:
-                                break
-                            pass
-                        if chunk_message:
-                            if output_is_piped:
-                                sys.stdout.write(chunk_message)
-                            else:
-                                sys.stdout.write(colors.green(chunk_message))
-                            full_response += chunk_message
-                            obj_chat_history["bot"] += chunk_message
-                            sys.stdout.flush()
-                except (KeyboardInterrupt, EOFError):
+                if turn["cancelled"] and not turn["started"]:
+                    raise KeyboardInterrupt
+                full_response = turn["content"]
+                if turn["cancelled"]:
                     full_response += " [cancelled]"
-                    obj_chat_history["bot"] += " [cancelled]"
+                    response_complete = False
+                elif turn["stalled"]:
+                    full_response += " [stalled]"
+                    response_complete = False
+                obj_chat_history["bot"] = full_response
+                obj_chat_history["stats"] = telemetry.turn_stats(turn, selected_model)
+
+            if cache_key and cached_response is None and full_response:
+                if response_complete:
+                    cache.put(
+                        cache_key,
+                        config.CHA_CURRENT_PLATFORM_NAME,
+                        selected_model,
+                        full_response,
+                    )
 
             if full_response:
-                messages.append({"role": "assistant", "content": full_response})
+                conversation.add_message("assistant", full_response)
                 if (
-                    not reasoning_model
+                    (not reasoning_model or cached_response is not None)
+                    and not (fanout_targets and not single_response)
                     and not full_response.endswith("\n")
                     and not output_is_piped
                 ):
                     sys.stdout.write("\n")
                     sys.stdout.flush()
 
+            if (
+                config.CHA_SHOW_TURN_STATS
+                and obj_chat_history.get("stats")
+                and not (fanout_targets and not single_response)
+                and not output_is_piped
+            ):
+                telemetry.print_status(obj_chat_history["stats"])
+
         except (KeyboardInterrupt, EOFError):
             if not output_is_piped:
                 loading.stop_loading()
-            if messages and messages[-1]["role"] == "user":
-                messages.pop()
+            last_message = conversation.last_message()
+            if last_message and last_message["role"] == "user":
+                conversation.pop_message()
+            continue
+        except TimeoutError as e:
+            # NOTE: a provider that never answered costs this turn only, the session stays open
+            if not output_is_piped:
+                loading.stop_loading()
+                print(colors.red(f"Error during chat: {e}"))
+            last_message = conversation.last_message()
+            if last_message and last_message["role"] == "user":
+                conversation.pop_message()
+            if single_response:
+                break
             continue
         except Exception as e:
             if not output_is_piped:
@@ -1281,7 +1353,7 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
                 print(colors.red(f"Error during chat: {e}"))
             break
 
-        CURRENT_CHAT_HISTORY.append(obj_chat_history)
+        conversation.add_record(obj_chat_history)
         HISTORY_MODIFIED = True
 
         if single_response:
@@ -1289,7 +1361,7 @@ def chatbot(selected_model, print_title=True, filepath=None, content_string=None
 
 
 def cli():
-    global CURRENT_CHAT_HISTORY, HISTORY_MODIFIED
+    global CURRENT_CHAT_HISTORY, HISTORY_MODIFIED, JOURNAL
 
     save_chat_state = True
     args = None
@@ -1443,6 +1515,38 @@ def cli():
             dest="load_history_file",
             help="Load a chat history from a file",
         )
+        parser.add_argument(
+            "--batch",
+            dest="batch_file",
+            help="Run every prompt in a JSONL file concurrently and print the results as JSONL ('-' reads stdin)",
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            dest="no_cache",
+            help="Skip the response cache for this call",
+        )
+        parser.add_argument(
+            "--daemon",
+            nargs="?",
+            const="start",
+            choices=["start", "stop", "status", "run"],
+            help="Manage a background daemon that keeps cha warm for non-interactive calls",
+        )
+        parser.add_argument(
+            "--profile-startup",
+            nargs="?",
+            const="table",
+            choices=["table", "json"],
+            help="Profile import and startup cost in a fresh interpreter, 'json' prints the raw breakdown",
+        )
+        parser.add_argument(
+            "--recompress-history",
+            nargs="?",
+            const="default",
+            choices=["default", "gzip", "zstd", "none"],
+            help="Rewrite all saved history files as gzip, zstd, or plain json (default: CHA_HISTORY_COMPRESSION, else gzip)",
+        )
         parser.add_argument(
             "string",
             nargs="*",
@@ -1451,6 +1555,25 @@ def cli():
 
         args = parser.parse_args()
 
+        if args.daemon:
+            daemon.run_command(args.daemon)
+            return
+
+        if args.profile_startup:
+            from cha import profiler
+
+            profiler.run(args.profile_startup)
+            return
+
+        if args.recompress_history:
+            from cha import history
+
+            compression = args.recompress_history
+            if compression == "default":
+                compression = config.CHA_HISTORY_COMPRESSION or "gzip"
+            history.run_recompress(compression)
+            return
+
         if args.continue_chat:
             history_dir = config.LOCAL_CHA_CONFIG_HISTORY_DIR
             if not os.path.isdir(history_dir):
@@ -1458,23 +1581,26 @@ def cli():
                 return
 
             try:
-                json_files = [
-                    f
-                    for f in os.listdir(history_dir)
-                    if f.startswith("cha_hs_") and f.endswith(".json")
-                ]
-                if not json_files:
+                from cha import journal
+
+                if journal.recover():
+                    print(
+                        colors.yellow("Recovered unsaved chats from a crashed session")
+                    )
+            except Exception as e:
+                if config.CHA_DEBUG_MODE:
+                    print(colors.red(f"Failed to recover the history journal: {e}"))
+
+            try:
+                from cha import history, local
+
+                # NOTE: the manifest in the history index names the newest chat, only that file is read
+                history_file_path = history.latest_path(history_dir)
+                if history_file_path is None:
                     print(colors.red("No chat history found"))
                     return
 
-                latest_file = max(
-                    json_files,
-                    key=lambda f: int(re.search(r"cha_hs_(\d+)\.json", f).group(1)),
-                )
-                history_file_path = os.path.join(history_dir, latest_file)
-
-                with open(history_file_path, "r", encoding="utf-8") as f:
-                    history_data = json.load(f)
+                history_data = local.read_json(history_file_path)
 
                 chat_history = None
                 if isinstance(history_data, dict) and "chat" in history_data:
@@ -1491,8 +1617,6 @@ def cli():
                 CURRENT_CHAT_HISTORY.extend(chat_history)
                 HISTORY_MODIFIED = False
 
-                from cha import local
-
                 local.print_history_browse_and_select_history_file(CURRENT_CHAT_HISTORY)
 
             except Exception as e:
@@ -1513,8 +1637,9 @@ def cli():
                 return
 
             try:
-                with open(history_file_path, "r", encoding="utf-8") as f:
-                    history_data = json.load(f)
+                from cha import local
+
+                history_data = local.read_json(history_file_path)
 
                 chat_history = None
                 if isinstance(history_data, dict) and "chat" in history_data:
@@ -1544,8 +1669,6 @@ def cli():
                             }
                         )
 
-                    from cha import local
-
                     print(colors.magenta(history_file_path))
                     local.print_history_browse_and_select_history_file(
                         CURRENT_CHAT_HISTORY
@@ -1565,12 +1688,7 @@ def cli():
             return
 
         if args.version:
-            try:
-                from importlib.metadata import version
-
-                print(f"{version('cha')} (Cha)")
-            except:
-                print("?")
+            dispatch.print_version()
             return
 
         if args.init:
@@ -1590,22 +1708,7 @@ def cli():
             return
 
         if args.history_search:
-            try:
-                from cha import local
-
-                hs_output = local.browse_and_select_history_file(
-                    exact_mode=(args.history_search == "exact")
-                )
-                if hs_output and isinstance(hs_output, dict):
-                    selected_path = hs_output.get("path")
-                    chat_msgs = hs_output.get("chat")
-                    if selected_path and chat_msgs:
-                        print(colors.magenta(selected_path))
-                        local.print_history_browse_and_select_history_file(chat_msgs)
-            except (KeyboardInterrupt, EOFError):
-                print()
-            except Exception as e:
-                print(colors.red(f"Failed to search history: {e}"))
+            dispatch.search_history(args.history_search)
             return
 
         if args.editor:
@@ -1847,6 +1950,13 @@ def cli():
                 # user cancelled model selection - exit silently
                 return
 
+        if args.batch_file:
+            save_chat_state = False
+            from cha import batch
+
+            batch.run_batch(args.batch_file, selected_model)
+            return
+
         if args.token_count:
             save_chat_state = False
 
@@ -1859,8 +1969,8 @@ def cli():
                 content_mode = "STRING"
                 text = " ".join(args.string)
             elif not sys.stdin.isatty():
-                content_mode = "PIPE"
-                text = sys.stdin.read()
+                dispatch.print_stdin_token_count(selected_model)
+                return
 
             if text is None:
                 if sys.stdout.isatty():
@@ -1871,20 +1981,8 @@ def cli():
                     )
                 return
 
-            try:
-                token_count = utils.count_tokens(text, selected_model)
-                if token_count is None:
-                    raise Exception("Failed to calculate token count")
-                if sys.stdout.isatty():
-                    print(colors.green("Content Type:"), content_mode)
-                    print(colors.green("Selected Model:"), args.model)
-                    print(colors.green("Text Length:"), len(text), "chars")
-                    print(colors.green("Token Count:"), token_count, "tokens")
-                else:
-                    print(f"{token_count}")
-                return
-            except Exception as e:
-                raise Exception(f"Error counting tokens: {e}")
+            dispatch.print_token_count(text, content_mode, selected_model)
+            return
 
         input_mode = "interactive"
         processed_input_for_chatbot = (
@@ -1918,16 +2016,37 @@ def cli():
             processed_input_for_chatbot = editor_content
             input_mode = "ide"
 
+        # NOTE: only repeatable one-shot prompts are cached, editor input is left out
+        use_cache = config.CHA_RESPONSE_CACHE_ENABLED and not args.no_cache
+
         # call chatbot based on input mode
         if input_mode in ["pipe_with_args", "pipe_only", "string_args", "ide"]:
             chatbot(
                 selected_model,
                 title_print_value,
                 content_string=processed_input_for_chatbot,
+                use_cache=use_cache and input_mode != "ide",
             )
         elif input_mode == "file":
-            chatbot(selected_model, title_print_value, filepath=args.file)
+            chatbot(
+                selected_model,
+                title_print_value,
+                filepath=args.file,
+                use_cache=use_cache,
+            )
         else:
+            if (
+                config.CHA_LOCAL_SAVE_ALL_CHA_CHATS == True
+                and config.CHA_HISTORY_JOURNAL_ENABLED
+                and save_chat_state == True
+                and os.path.exists(config.LOCAL_CHA_CONFIG_HISTORY_DIR)
+            ):
+                from cha import journal
+
+                try:
+                    JOURNAL = journal.Journal(CURRENT_CHAT_HISTORY, vars(args))
+                except OSError:
+                    JOURNAL = None
             chatbot(selected_model=selected_model, print_title=title_print_value)
 
         if (
@@ -1978,6 +2097,7 @@ def cli():
         pass
 
     # save chat locally if desired
+    history_saved = False
     try:
         if (
             config.CHA_LOCAL_SAVE_ALL_CHA_CHATS == True
@@ -1986,46 +2106,22 @@ def cli():
             and os.path.exists(config.LOCAL_CHA_CONFIG_HISTORY_DIR)
             and HISTORY_MODIFIED
         ):
-            from datetime import datetime, timezone
-            from importlib.metadata import version
-            import uuid
+            from cha import history
 
-            try:
-                version_id = str(version("cha"))
-            except:
-                version_id = "?"
-
-            epoch_time_seconds = time.time()
-            utc_time_stamp = f"{datetime.now(timezone.utc)} UTC"
-            file_id = str(uuid.uuid4())
-
-            history_save = {
-                "chat": CURRENT_CHAT_HISTORY,
-                "id": file_id,
-                "version": version_id,
-                "date": {
-                    "epoch": {"seconds": epoch_time_seconds},
-                    "utc": utc_time_stamp,
-                },
-                "args": {},
-                "config": utils.get_json_serializable_globals(config),
-            }
-
-            if args != None:
-                history_save["args"] = vars(args)
-
-            file_path = os.path.join(
-                config.LOCAL_CHA_CONFIG_HISTORY_DIR,
-                f"cha_hs_{int(epoch_time_seconds)}.json",
+            history.save_chat(
+                CURRENT_CHAT_HISTORY, args=vars(args) if args != None else {}
             )
-
-            utils.write_json(file_path, history_save)
+        history_saved = True
     except Exception as e:
         if config.CHA_DEBUG_MODE:
             print(colors.red(str(traceback.format_exc())))
         else:
             print(colors.red(f"Unexpected error well handling local logic: {str(e)}"))
 
+    if JOURNAL is not None:
+        # NOTE: a journal whose chat could not be saved is kept for "cha -c" to recover
+        JOURNAL.close(remove=history_saved)
+
     # display visited directories on exit if enabled and directories were visited
     if (
         config.CHA_SHOW_VISITED_DIRECTORIES_ON_EXIT
@@ -0,0 +1,311 @@
+import argparse
+import random
+import time
+import json
+import sys
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from cha import config
+
+_WORDS = (
+    "the quick brown fox jumps over the lazy dog while a small cat watches "
+    "from the window and the rain keeps falling on the quiet street outside"
+).split()
+
+# NOTE: filled in by serve(), the handler reads it for every request
+settings = {}
+
+
+def _reply_tokens(messages):
+    """
+    The reply as a list of tokens, either the last user message echoed back or
+    a fixed number of filler words
+    """
+    if settings["echo"]:
+        text = ""
+        for message in reversed(messages):
+            if message.get("role") == "user":
+                text = str(message.get("content") or "")
+                break
+        return [word + " " for word in text.split()] or ["(empty)"]
+
+    count = settings["reply_tokens"]
+    return [_WORDS[i % len(_WORDS)] + " " for i in range(count)]
+
+
+def _usage(messages, completion_tokens):
+    prompt_tokens = sum(
+        len(str(message.get("content") or "").split()) for message in messages
+    )
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _chunk(model, content=None, finish_reason=None):
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "delta": {} if content is None else {"content": content},
+                "finish_reason": finish_reason,
+            }
+        ],
+    }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if settings.get("verbose"):
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_event(self, data):
+        event = f"data: {data}\n\n".encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if not self.path.rstrip("/").endswith("/models"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+        self._send_json(
+            200,
+            {
+                "object": "list",
+                "data": [
+                    {"id": name, "object": "model", "created": 0, "owned_by": "cha"}
+                    for name in settings["models"]
+                ],
+            },
+        )
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "Invalid JSON body"}})
+            return
+
+        if random.random() < settings["fail_rate"]:
+            self._send_json(
+                settings["fail_status"],
+                {"error": {"message": "Injected failure", "type": "mock_error"}},
+            )
+            return
+
+        model = body.get("model") or settings["models"][0]
+        messages = body.get("messages") or []
+        tokens = _reply_tokens(messages)
+        usage = _usage(messages, len(tokens))
+
+        time.sleep(settings["ttft"])
+
+        if not body.get("stream"):
+            if settings["tokens_per_second"] > 0:
+                time.sleep(len(tokens) / settings["tokens_per_second"])
+            self._send_json(
+                200,
+                {
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {
+                                "role": "assistant",
+                                "content": "".join(tokens),
+                            },
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": usage,
+                },
+            )
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        chunk_tokens = max(1, settings["chunk_tokens"])
+        stall_at = None
+        if random.random() < settings["stall_rate"]:
+            stall_at = random.randrange(1, max(2, len(tokens)))
+
+        try:
+            for i in range(0, len(tokens), chunk_tokens):
+                if i > 0 and settings["tokens_per_second"] > 0:
+                    time.sleep(chunk_tokens / settings["tokens_per_second"])
+                if stall_at is not None and i >= stall_at:
+                    # NOTE: a stalled stream stays open without sending anything, then hangs up
+                    time.sleep(settings["stall_seconds"])
+                    self.close_connection = True
+                    return
+                content = "".join(tokens[i : i + chunk_tokens])
+                self._write_event(json.dumps(_chunk(model, content)))
+
+            self._write_event(json.dumps(_chunk(model, finish_reason="stop")))
+            if (body.get("stream_options") or {}).get("include_usage"):
+                final = _chunk(model)
+                final["choices"] = []
+                final["usage"] = usage
+                self._write_event(json.dumps(final))
+            self._write_event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # the client cancelled the request
+            self.close_connection = True
+
+
+def serve(
+    host=config.CHA_MOCK_API_HOST,
+    port=config.CHA_MOCK_API_PORT,
+    models=None,
+    ttft=0.2,
+    tokens_per_second=50,
+    chunk_tokens=1,
+    reply_tokens=64,
+    echo=False,
+    fail_rate=0,
+    fail_status=500,
+    stall_rate=0,
+    stall_seconds=120,
+    seed=None,
+    verbose=False,
+):
+    """
+    Run an OpenAI compatible stand-in server until interrupted, it serves
+    /v1/models and streaming and non-streaming /v1/chat/completions
+    """
+    if seed is not None:
+        random.seed(seed)
+    settings.update(
+        {
+            "models": models or list(config.CHA_MOCK_API_MODELS),
+            "ttft": ttft,
+            "tokens_per_second": tokens_per_second,
+            "chunk_tokens": chunk_tokens,
+            "reply_tokens": reply_tokens,
+            "echo": echo,
+            "fail_rate": fail_rate,
+            "fail_status": fail_status,
+            "stall_rate": stall_rate,
+            "stall_seconds": stall_seconds,
+            "verbose": verbose,
+        }
+    )
+
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    print(
+        f"Mock API listening on http://{host}:{server.server_port}/v1",
+        file=sys.stderr,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local OpenAI compatible mock server for offline testing"
+    )
+    parser.add_argument("--host", default=config.CHA_MOCK_API_HOST)
+    parser.add_argument("--port", type=int, default=config.CHA_MOCK_API_PORT)
+    parser.add_argument(
+        "--models",
+        default=",".join(config.CHA_MOCK_API_MODELS),
+        help="Comma separated model names listed by /v1/models",
+    )
+    parser.add_argument(
+        "--ttft", type=float, default=0.2, help="Seconds before the first token"
+    )
+    parser.add_argument(
+        "--tokens-per-second",
+        type=float,
+        default=50,
+        help="Generation speed after the first token, 0 means no delay",
+    )
+    parser.add_argument(
+        "--chunk-tokens", type=int, default=1, help="Tokens sent per stream chunk"
+    )
+    parser.add_argument(
+        "--reply-tokens", type=int, default=64, help="Length of the filler reply"
+    )
+    parser.add_argument(
+        "--echo",
+        action="store_true",
+        help="Reply with the last user message instead of filler words",
+    )
+    parser.add_argument(
+        "--fail-rate",
+        type=float,
+        default=0,
+        help="Fraction of requests answered with --fail-status",
+    )
+    parser.add_argument("--fail-status", type=int, default=500)
+    parser.add_argument(
+        "--stall-rate",
+        type=float,
+        default=0,
+        help="Fraction of streams that stop sending partway through",
+    )
+    parser.add_argument(
+        "--stall-seconds",
+        type=float,
+        default=120,
+        help="How long a stalled stream stays open",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    serve(
+        host=args.host,
+        port=args.port,
+        models=[m.strip() for m in args.models.split(",") if m.strip()],
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        chunk_tokens=args.chunk_tokens,
+        reply_tokens=args.reply_tokens,
+        echo=args.echo,
+        fail_rate=args.fail_rate,
+        fail_status=args.fail_status,
+        stall_rate=args.stall_rate,
+        stall_seconds=args.stall_seconds,
+        seed=args.seed,
+        verbose=args.verbose,
+    )
+
+
+if __name__ == "__main__":
+    main()
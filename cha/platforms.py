@@ -1,8 +1,9 @@
 import subprocess
 import copy
+import os
 
 from cha import utils, config, colors, loading
-from cha.client import get_current_chat_client
+from cha.client import get_current_chat_client, _current_chat_client_params
 
 
 def list_models():
@@ -191,3 +192,37 @@ def auto_select_a_platform(platform_key=None, model_name=None):
     output["platform_name"] = platform_key
 
     return output
+
+
+def resolve_target(platform_name, model_name):
+    """
+    Turn a platform/model pair into the client parameters for it, a None
+    platform means the platform that is currently selected
+    """
+    if platform_name is None:
+        return {
+            "api_key": _current_chat_client_params["api_key"],
+            "base_url": _current_chat_client_params["base_url"],
+            "platform": config.CHA_CURRENT_PLATFORM_NAME,
+            "model": model_name,
+        }
+
+    if platform_name == "openai":
+        return {
+            "api_key": None,
+            "base_url": None,
+            "platform": "openai",
+            "model": model_name,
+        }
+
+    if platform_name not in config.THIRD_PARTY_PLATFORMS:
+        raise ValueError(f"Unknown platform '{platform_name}'")
+
+    platform_data = config.THIRD_PARTY_PLATFORMS[platform_name]
+    env_name = platform_data["env_name"]
+    return {
+        "api_key": os.environ.get(env_name, env_name),
+        "base_url": platform_data["base_url"],
+        "platform": platform_name,
+        "model": model_name,
+    }
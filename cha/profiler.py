@@ -0,0 +1,168 @@
+import subprocess
+import json
+import time
+import sys
+import os
+import re
+
+from cha import colors
+
+_IMPORT_TIME_LINE = re.compile(r"^import time:\s+(-?\d+)\s+\|\s+(-?\d+)\s+\|(\s*)(\S+)")
+
+# NOTE: marks the phase timings on the child's stdout, anything else printed there is ignored
+_PHASES_TAG = "CHA_STARTUP_PHASES="
+
+
+def _measure_phases():
+    """
+    Runs inside the profiled child, times each startup phase in the order a
+    real interactive session goes through them. Config load is taken from the
+    import times instead, this module already imported it.
+    """
+    import contextlib
+    import io
+
+    from cha import config
+
+    phases = {}
+
+    start = time.perf_counter()
+    from cha import main, client
+
+    phases["cha.main imports"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    client.warmup_thread_obj.join()
+    client._ensure_openai_module_is_loaded()
+    phases["openai warm-up join"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    config.get_external_tools_execute()
+    phases["tool validation"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        main.title_print(config.CHA_DEFAULT_MODEL)
+        print(colors.blue("User: "), end="", flush=True)
+    phases["first prompt render"] = time.perf_counter() - start
+
+    sys.stdout.write(_PHASES_TAG + json.dumps(phases) + "\n")
+    sys.stdout.flush()
+
+
+def _parse_import_times(stderr_text):
+    """
+    Turn -X importtime output into self and cumulative times per module, the
+    openai warm-up imports on a thread so overlapping lines can report negative
+    self times, those are counted as zero
+    """
+    modules, cumulative = {}, {}
+    for line in stderr_text.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        modules[name] = modules.get(name, 0) + max(int(match.group(1)), 0)
+        cumulative[name] = cumulative.get(name, 0) + max(int(match.group(2)), 0)
+    return modules, cumulative
+
+
+def collect():
+    """
+    Start a fresh interpreter with -X importtime, run the startup phases in
+    it, and return the phase timings plus import cost per module and per top
+    level package, all in seconds
+    """
+    env = dict(os.environ)
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in [package_root, env.get("PYTHONPATH")] if p
+    )
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "from cha import profiler; profiler._measure_phases()",
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+        text=True,
+    )
+    wall_seconds = time.perf_counter() - start
+
+    child_phases = None
+    for line in result.stdout.splitlines():
+        if line.startswith(_PHASES_TAG):
+            child_phases = json.loads(line[len(_PHASES_TAG) :])
+    if child_phases is None:
+        raise Exception(
+            f"Startup profile failed: {result.stderr.strip().splitlines()[-1:] or result.returncode}"
+        )
+
+    modules, cumulative = _parse_import_times(result.stderr)
+    phases = {"config load": cumulative.get("cha.config", 0) / 1_000_000}
+    phases.update(child_phases)
+
+    packages = {}
+    for name, self_us in modules.items():
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    return {
+        "python": sys.version.split()[0],
+        "wall_seconds": round(wall_seconds, 6),
+        "phases": {name: round(value, 6) for name, value in phases.items()},
+        "packages": {
+            name: round(value / 1_000_000, 6)
+            for name, value in sorted(packages.items(), key=lambda x: -x[1])
+        },
+        "modules": {
+            name: round(value / 1_000_000, 6)
+            for name, value in sorted(modules.items(), key=lambda x: -x[1])
+        },
+    }
+
+
+def _print_table(title, values, limit=None):
+    items = list(values.items())
+    if limit:
+        items = items[:limit]
+    if not items:
+        return
+    print(colors.yellow(colors.underline(title)))
+    name_len = max(len(name) for name, _ in items)
+    for name, seconds in items:
+        print(f"{name:<{name_len}} = {seconds * 1000:9.2f} ms")
+    print()
+
+
+def print_breakdown(profile, top=15):
+    _print_table("Startup Phases", profile["phases"])
+    _print_table("Import Cost by Package", profile["packages"], limit=top)
+    _print_table("Slowest Modules (self time)", profile["modules"], limit=top)
+    print(
+        colors.yellow(
+            f"Profiled process ran for {profile['wall_seconds'] * 1000:.2f} ms (python {profile['python']})"
+        )
+    )
+
+
+def run(output="table"):
+    """
+    Entry point for --profile-startup, prints a sorted breakdown or the raw
+    profile as JSON
+    """
+    if output == "table":
+        print(colors.magenta("Profiling startup in a fresh interpreter..."))
+    profile = collect()
+
+    if output == "json":
+        print(json.dumps(profile, indent=4))
+    else:
+        print_breakdown(profile)
@@ -0,0 +1,49 @@
+import time
+import sys
+
+from cha import colors, config
+
+
+class StreamRenderer:
+    """
+    Output sink for streamed responses. Chunks are buffered and written in
+    batches, on a newline or once the flush interval has passed, so a long
+    answer costs a few hundred writes instead of one per delta. The full text
+    is kept as a list of parts and joined once at the end.
+    """
+
+    def __init__(self, output_is_piped=False, echo=True, flush_interval=None):
+        self.output_is_piped = output_is_piped
+        self.echo = echo
+        self.flush_interval = (
+            config.CHA_STREAM_FLUSH_INTERVAL_SECONDS
+            if flush_interval is None
+            else flush_interval
+        )
+        self._parts = []
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def write(self, text):
+        self._parts.append(text)
+        if not self.echo:
+            return
+        self._pending.append(text)
+        if "\n" in text or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        batch = "".join(self._pending)
+        self._pending.clear()
+        if self.output_is_piped:
+            # NOTE: piped output skips all formatting
+            sys.stdout.write(batch)
+        else:
+            sys.stdout.write(colors.green(batch))
+        sys.stdout.flush()
+
+    def text(self):
+        return "".join(self._parts)
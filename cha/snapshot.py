@@ -0,0 +1,88 @@
+import hashlib
+import types
+import json
+import os
+
+from cha import config
+
+# NOTE: a snapshot is the json-serializable part of the config module, stored once under its sha256 so history files only carry the hash
+_SKIPPED_TYPES = (types.ModuleType, types.FunctionType, types.BuiltinFunctionType, type)
+
+# canonical snapshot text to its hash, a config that did not change is not hashed or written again
+_stored_hashes = {}
+
+
+def snapshot_dir():
+    return os.path.join(config.LOCAL_CHA_CONFIG_DIR, "config_snapshots")
+
+
+def snapshot_path(digest):
+    return os.path.join(snapshot_dir(), f"{digest}.json")
+
+
+def _json_default(value):
+    # NOTE: sets such as BINARY_EXTENSIONS are stored sorted so the same config always hashes the same, nested types like those in TOOL_MOST_HAVE_VARIABLES by name
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if isinstance(value, type):
+        return value.__name__
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _snapshot_text(values):
+    return json.dumps(
+        values, sort_keys=True, separators=(",", ":"), default=_json_default
+    )
+
+
+def _config_text():
+    """
+    The public json-serializable globals of the config module as canonical
+    text. Private loader state, modules, functions and classes are skipped
+    and the rest is dumped in one pass, values are only probed one by one
+    when a user config sets something that cannot be serialized.
+    """
+    # NOTE: the lazy tables are built first, otherwise the same config would hash differently depending on what the session had read
+    for name in config._LAZY_TABLES:
+        getattr(config, name)
+
+    values = {
+        k: v
+        for k, v in vars(config).items()
+        if not k.startswith("_") and not isinstance(v, _SKIPPED_TYPES)
+    }
+    try:
+        return _snapshot_text(values)
+    except (TypeError, ValueError, OverflowError):
+        pass
+
+    serializable = {}
+    for k, v in values.items():
+        try:
+            _snapshot_text(v)
+        except (TypeError, ValueError, OverflowError):
+            continue
+        serializable[k] = v
+    return _snapshot_text(serializable)
+
+
+def store(values=None):
+    """
+    Save a config snapshot unless one with the same content exists and
+    return its hash, values defaults to the current config
+    """
+    text = _config_text() if values is None else _snapshot_text(values)
+    digest = _stored_hashes.get(text)
+    if digest is not None:
+        return digest
+
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    path = snapshot_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(snapshot_dir(), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    _stored_hashes[text] = digest
+    return digest
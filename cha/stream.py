@@ -0,0 +1,278 @@
+import asyncio
+import time
+
+from cha import config, platforms
+from cha.render import StreamRenderer
+from cha.client import get_current_async_chat_client, get_async_chat_client, run_async
+
+# NOTE: base urls of platforms that rejected stream_options, they are asked without it from then on
+_usage_unsupported = set()
+
+
+class StreamStalled(Exception):
+    pass
+
+
+def _chunk_text(chunk):
+    if not chunk.choices and getattr(chunk, "usage", None):
+        return None
+    return chunk.choices[0].delta.content
+
+
+def _note_chunk(chunk, meta):
+    meta["chunks"] += 1
+    usage = getattr(chunk, "usage", None)
+    if usage:
+        meta["usage"] = usage.model_dump(exclude_none=True)
+
+
+async def _close_response(response):
+    try:
+        await response.close()
+    except Exception:
+        pass
+
+
+async def _open_stream(client, model, messages):
+    """
+    Send the request and wait for its first chunk. Returns the response, its
+    chunk iterator, the first chunk's text (None when it had no content or the
+    reply was empty), and the chunk count and usage seen so far.
+    """
+    kwargs = {}
+    if (
+        config.CHA_STREAM_INCLUDE_USAGE
+        and str(client.base_url) not in _usage_unsupported
+    ):
+        kwargs["stream_options"] = {"include_usage": True}
+    try:
+        response = await client.chat.completions.create(
+            model=model, messages=messages, stream=True, **kwargs
+        )
+    except Exception as e:
+        from openai import BadRequestError
+
+        if not kwargs or not isinstance(e, BadRequestError):
+            raise
+        _usage_unsupported.add(str(client.base_url))
+        response = await client.chat.completions.create(
+            model=model, messages=messages, stream=True
+        )
+
+    chunks = response.__aiter__()
+    meta = {"chunks": 0, "usage": None}
+    try:
+        try:
+            chunk = await chunks.__anext__()
+        except StopAsyncIteration:
+            return response, chunks, None, meta
+        _note_chunk(chunk, meta)
+        # NOTE: any chunk counts as first activity, reasoning models can stream empty or reasoning deltas for a long time before content
+        try:
+            return response, chunks, _chunk_text(chunk) or None, meta
+        except Exception:
+            return response, chunks, None, meta
+    except BaseException:
+        await _close_response(response)
+        raise
+
+
+def _hedge_client(client, model):
+    """
+    Client and model for the hedged request, CHA_STREAM_HEDGE_FALLBACK can
+    point it at another platform, otherwise the same request is sent twice
+    """
+    fallback = config.CHA_STREAM_HEDGE_FALLBACK
+    if not fallback:
+        return client, model
+    platform_name, _, fallback_model = str(fallback).partition("|")
+    target = platforms.resolve_target(platform_name or None, fallback_model or model)
+    return (
+        get_async_chat_client(api_key=target["api_key"], base_url=target["base_url"]),
+        target["model"],
+    )
+
+
+async def _race_first_token(client, model, messages):
+    """
+    Wait for the first chunk under the TTFT deadline. With hedging enabled a
+    second request is started once CHA_STREAM_HEDGE_AFTER_SECONDS pass without
+    a chunk, and whichever stream responds first wins.
+    """
+    deadline = config.CHA_STREAM_FIRST_TOKEN_TIMEOUT_SECONDS
+    hedge_after = config.CHA_STREAM_HEDGE_AFTER_SECONDS
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+
+    attempts = [asyncio.create_task(_open_stream(client, model, messages))]
+    hedged = not hedge_after
+    last_error = None
+
+    try:
+        while attempts:
+            timeout = None
+            if deadline:
+                timeout = deadline - (loop.time() - started_at)
+            if not hedged:
+                until_hedge = hedge_after - (loop.time() - started_at)
+                timeout = until_hedge if timeout is None else min(timeout, until_hedge)
+
+            done, _ = await asyncio.wait(
+                attempts,
+                timeout=None if timeout is None else max(timeout, 0),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+
+            for task in done:
+                attempts.remove(task)
+                if task.exception() is None:
+                    return task.result()
+                last_error = task.exception()
+
+            if deadline and loop.time() - started_at >= deadline:
+                raise asyncio.TimeoutError
+
+            if not hedged and loop.time() - started_at >= hedge_after:
+                hedged = True
+                hedge_client, hedge_model = _hedge_client(client, model)
+                attempts.append(
+                    asyncio.create_task(
+                        _open_stream(hedge_client, hedge_model, messages)
+                    )
+                )
+    finally:
+        # NOTE: the losing requests are cancelled and any stream they opened is closed
+        for task in attempts:
+            task.cancel()
+        for task in attempts:
+            try:
+                response, _, _, _ = await task
+                await _close_response(response)
+            except BaseException:
+                pass
+
+    raise last_error
+
+
+async def _read_chunks(chunks, queue, meta, state):
+    error_count = 0
+    stall_timeout = config.CHA_STREAM_STALL_TIMEOUT_SECONDS or None
+    while True:
+        try:
+            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=stall_timeout)
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            raise StreamStalled
+        _note_chunk(chunk, meta)
+        try:
+            chunk_message = _chunk_text(chunk)
+        except Exception:
+            error_count += 1
+            if error_count > config.CHA_STREAMING_ERROR_LIMIT:
+                break
+            continue
+        if chunk_message:
+            if state["first_token_time"] is None:
+                state["first_token_time"] = time.monotonic()
+            await queue.put(chunk_message)
+
+
+async def _render_chunks(queue, renderer):
+    while True:
+        try:
+            chunk_message = await asyncio.wait_for(
+                queue.get(), timeout=renderer.flush_interval
+            )
+        except asyncio.TimeoutError:
+            # NOTE: the stream went quiet, so show whatever is still buffered
+            renderer.flush()
+            continue
+        if chunk_message is None:
+            renderer.flush()
+            return
+        renderer.write(chunk_message)
+
+
+async def stream_chat_turn(client, model, messages, output_is_piped=False, echo=True):
+    """
+    Stream one chat completion. The network reader and the renderer run as
+    separate tasks joined by a queue, so formatting and terminal writes never
+    hold up the socket. Several turns can be awaited concurrently as long as
+    at most one of them echoes to the terminal.
+
+    A request that produces no chunk before the TTFT deadline is cancelled
+    and retried up to CHA_STREAM_RETRIES times. A stream that stalls after it
+    started is stopped and its partial text is returned with stalled set.
+    """
+    started_at = time.time()
+    start_time = time.monotonic()
+    state = {
+        "started": False,
+        "cancelled": False,
+        "stalled": False,
+        "first_token_time": None,
+    }
+    renderer = StreamRenderer(output_is_piped=output_is_piped, echo=echo)
+    queue = asyncio.Queue()
+    render_task = asyncio.create_task(_render_chunks(queue, renderer))
+
+    response = None
+    meta = {"chunks": 0, "usage": None}
+    try:
+        for attempt in range(config.CHA_STREAM_RETRIES + 1):
+            try:
+                response, chunks, first_text, meta = await _race_first_token(
+                    client, model, messages
+                )
+                break
+            except asyncio.TimeoutError:
+                if attempt == config.CHA_STREAM_RETRIES:
+                    raise TimeoutError(
+                        f"No response from {model} within {config.CHA_STREAM_FIRST_TOKEN_TIMEOUT_SECONDS} seconds"
+                    )
+
+        state["started"] = True
+        if first_text:
+            state["first_token_time"] = time.monotonic()
+            await queue.put(first_text)
+        await _read_chunks(chunks, queue, meta, state)
+    except asyncio.CancelledError:
+        state["cancelled"] = True
+    except StreamStalled:
+        state["stalled"] = True
+    finally:
+        await queue.put(None)
+        await render_task
+        if response is not None and (state["cancelled"] or state["stalled"]):
+            await _close_response(response)
+
+    first_token_time = state["first_token_time"]
+    return {
+        "started_at": started_at,
+        "content": renderer.text(),
+        "started": state["started"],
+        "cancelled": state["cancelled"],
+        "stalled": state["stalled"],
+        "first_token_seconds": (
+            None if first_token_time is None else first_token_time - start_time
+        ),
+        "seconds": time.monotonic() - start_time,
+        "chunks": meta["chunks"],
+        "usage": meta["usage"],
+    }
+
+
+def run_chat_turn(model, messages, output_is_piped=False):
+    """
+    Blocking entry point used by chatbot(), CTRL-C cancels the running turn
+    and the partial response is returned with cancelled set to True.
+    """
+    return run_async(
+        stream_chat_turn(
+            client=get_current_async_chat_client(),
+            model=model,
+            messages=messages,
+            output_is_piped=output_is_piped,
+        )
+    )
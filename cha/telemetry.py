@@ -0,0 +1,51 @@
+from cha import colors, utils
+
+
+def turn_stats(turn, model_name):
+    """
+    Latency and throughput of one streamed turn, in the shape stored on the
+    chat history record under "stats"
+    """
+    usage = turn.get("usage") or None
+    output_tokens = None
+    if usage and usage.get("completion_tokens") is not None:
+        output_tokens = usage["completion_tokens"]
+    elif turn.get("content"):
+        output_tokens = utils.count_tokens(turn["content"], model_name)
+        if output_tokens is None:
+            output_tokens = utils.count_tokens(turn["content"], None, fast_mode=True)
+
+    ttft = turn.get("first_token_seconds")
+    seconds = turn.get("seconds") or 0
+    # NOTE: throughput is measured over the generation only, after the first token
+    generation_seconds = seconds - (ttft or 0)
+    tokens_per_second = None
+    if output_tokens and generation_seconds > 0:
+        tokens_per_second = round(output_tokens / generation_seconds, 2)
+
+    return {
+        "started_at": turn.get("started_at"),
+        "ttft_seconds": None if ttft is None else round(ttft, 4),
+        "seconds": round(seconds, 4),
+        "chunks": turn.get("chunks"),
+        "output_tokens": output_tokens,
+        "tokens_per_second": tokens_per_second,
+        "usage": usage,
+    }
+
+
+def status_line(stats):
+    ttft = stats.get("ttft_seconds")
+    parts = [
+        f"ttft {'n/a' if ttft is None else f'{ttft:.2f}s'}",
+        f"{stats.get('tokens_per_second') or 0:.1f} tok/s",
+        f"{stats.get('output_tokens') or 0} tokens",
+        f"{stats.get('seconds') or 0:.2f}s total",
+    ]
+    if stats.get("chunks") is not None:
+        parts.append(f"{stats['chunks']} chunks")
+    return ", ".join(parts)
+
+
+def print_status(stats):
+    print(colors.yellow(status_line(stats)))
@@ -0,0 +1,198 @@
+import hashlib
+import sqlite3
+import time
+import os
+
+from cha import config, tokenizer
+
+# NOTE: counts are keyed by content digest and encoding, the files table maps a path at a given mtime and size to its count so unchanged files are not even hashed
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS token_counts (
+        digest TEXT NOT NULL,
+        encoding TEXT NOT NULL,
+        tokens INTEGER NOT NULL,
+        created REAL NOT NULL,
+        PRIMARY KEY (digest, encoding)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS files (
+        path TEXT NOT NULL,
+        encoding TEXT NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        tokens INTEGER NOT NULL,
+        created REAL NOT NULL,
+        PRIMARY KEY (path, encoding)
+    )
+    """,
+)
+
+
+def db_path():
+    return os.path.join(config.LOCAL_CHA_CONFIG_CACHE_DIR, "tokens.db")
+
+
+def _connect():
+    os.makedirs(config.LOCAL_CHA_CONFIG_CACHE_DIR, exist_ok=True)
+    connection = sqlite3.connect(db_path(), timeout=5)
+    connection.execute("PRAGMA journal_mode=WAL")
+    for statement in _SCHEMA:
+        connection.execute(statement)
+    return connection
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _prune(connection, table):
+    (total,) = connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+    extra = total - config.CHA_TOKEN_CACHE_MAX_ENTRIES
+    if extra > 0:
+        connection.execute(
+            f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY created LIMIT ?)",
+            (extra,),
+        )
+
+
+def _count_by_digest(connection, encoding_name, texts, model_name):
+    counts, missing = [None] * len(texts), {}
+    for i, text in enumerate(texts):
+        digest = _digest(text)
+        row = connection.execute(
+            "SELECT tokens FROM token_counts WHERE digest = ? AND encoding = ?",
+            (digest, encoding_name),
+        ).fetchone()
+        if row is not None:
+            counts[i] = row[0]
+        else:
+            missing.setdefault(digest, []).append(i)
+
+    if missing:
+        new_counts = tokenizer.count_many(
+            [texts[indexes[0]] for indexes in missing.values()], model_name
+        )
+        now = time.time()
+        rows = []
+        for (digest, indexes), count in zip(missing.items(), new_counts):
+            for i in indexes:
+                counts[i] = count
+            if count is not None:
+                rows.append((digest, encoding_name, count, now))
+        connection.executemany(
+            "INSERT OR REPLACE INTO token_counts VALUES (?, ?, ?, ?)", rows
+        )
+        _prune(connection, "token_counts")
+    return counts
+
+
+def _lookup_files(connection, encoding_name, files):
+    """
+    Cached counts of files unchanged since they were counted, plus their
+    (mtime_ns, size) and the paths that still need counting
+    """
+    counts, stats, pending = {}, {}, []
+    for path in files:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            pending.append(path)
+            continue
+        stats[path] = (stat.st_mtime_ns, stat.st_size)
+        row = connection.execute(
+            "SELECT tokens FROM files WHERE path = ? AND encoding = ? AND mtime_ns = ? AND size = ?",
+            (path, encoding_name, *stats[path]),
+        ).fetchone()
+        if row is not None:
+            counts[path] = row[0]
+        else:
+            pending.append(path)
+    return counts, stats, pending
+
+
+def _count_files(connection, encoding_name, files, model_name):
+    counts, stats, pending = _lookup_files(connection, encoding_name, files)
+    if pending:
+        pending_counts = _count_by_digest(
+            connection, encoding_name, [files[path] for path in pending], model_name
+        )
+        now = time.time()
+        rows = []
+        for path, count in zip(pending, pending_counts):
+            counts[path] = count
+            if count is not None and path in stats:
+                rows.append((path, encoding_name, *stats[path], count, now))
+        connection.executemany(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+        _prune(connection, "files")
+    return counts
+
+
+def _run_cached(counter, uncached, model_name, items):
+    encoding = tokenizer.get_encoding(model_name)
+    if encoding is None or not config.CHA_TOKEN_CACHE_ENABLED:
+        return uncached()
+    try:
+        connection = _connect()
+    except (OSError, sqlite3.Error):
+        return uncached()
+    try:
+        with connection:
+            return counter(connection, encoding.name, items, model_name)
+    except sqlite3.Error:
+        return uncached()
+    finally:
+        connection.close()
+
+
+def count_texts(texts, model_name):
+    """
+    Token counts for a list of texts, looked up by content digest so the same
+    text is only tokenized once per encoding
+    """
+    texts = [str(text) for text in texts]
+    return _run_cached(
+        _count_by_digest,
+        lambda: tokenizer.count_many(texts, model_name),
+        model_name,
+        texts,
+    )
+
+
+def count_files(files, model_name):
+    """
+    Token counts for a {path: content} dict, files whose mtime and size are
+    unchanged since the last run are answered without hashing or tokenizing
+    """
+    files = {path: str(content) for path, content in files.items()}
+    return _run_cached(
+        _count_files,
+        lambda: dict(
+            zip(files, tokenizer.count_many(list(files.values()), model_name))
+        ),
+        model_name,
+        files,
+    )
+
+
+def cached_file_counts(paths, model_name):
+    """
+    Token counts the cache already holds for files unchanged since they were
+    counted, nothing is tokenized and uncached files are left out
+    """
+    encoding = tokenizer.get_encoding(model_name)
+    if encoding is None or not config.CHA_TOKEN_CACHE_ENABLED:
+        return {}
+    try:
+        connection = _connect()
+    except (OSError, sqlite3.Error):
+        return {}
+    try:
+        return _lookup_files(connection, encoding.name, paths)[0]
+    except sqlite3.Error:
+        return {}
+    finally:
+        connection.close()
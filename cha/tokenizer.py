@@ -0,0 +1,194 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import os
+
+from cha import config
+
+# NOTE: this module loads tiktoken and the default encoding in the background, the same way client.py warms up openai
+_tiktoken_module_instance = None
+
+# encodings by name, None marks an encoding that failed to load so it is not retried
+_encoding_cache = {}
+# model name to encoding name, models of one family share a single encoding
+_model_encoding_names = {}
+_encoding_lock = threading.Lock()
+
+FALLBACK_ENCODING_NAME = "o200k_base"
+
+
+def _load_tiktoken():
+    global _tiktoken_module_instance
+    if _tiktoken_module_instance is None:
+        import tiktoken
+
+        _tiktoken_module_instance = tiktoken
+    return _tiktoken_module_instance
+
+
+def _encoding_name(model_name):
+    name = _model_encoding_names.get(model_name)
+    if name is not None:
+        return name
+
+    tiktoken = _load_tiktoken()
+    try:
+        name = tiktoken.encoding_name_for_model(str(model_name))
+    except KeyError:
+        name = FALLBACK_ENCODING_NAME
+    _model_encoding_names[model_name] = name
+    return name
+
+
+def get_encoding(model_name):
+    """
+    The encoding for a model, loaded once per process and shared by every
+    model that uses it. Returns None when tiktoken or the encoding is missing.
+    """
+    try:
+        name = _encoding_name(model_name)
+    except ImportError:
+        return None
+
+    if name in _encoding_cache:
+        return _encoding_cache[name]
+
+    with _encoding_lock:
+        if name not in _encoding_cache:
+            try:
+                _encoding_cache[name] = _load_tiktoken().get_encoding(name)
+            except Exception:
+                _encoding_cache[name] = None
+    return _encoding_cache[name]
+
+
+def _warm_tokenizer_func():
+    try:
+        get_encoding(config.CHA_DEFAULT_MODEL)
+    except Exception:
+        # NOTE: a failed warm-up surfaces later as a None count, never as a crash in this thread
+        pass
+
+
+# start the warmup thread when this module is imported
+warmup_thread_obj = threading.Thread(target=_warm_tokenizer_func, daemon=True)
+warmup_thread_obj.start()
+
+
+def _line_cut(text, low, end):
+    """
+    Index just past the last line break in text[low:end] that is followed by a
+    non-space character, or -1 when there is none
+    """
+    cut = text.rfind("\n", low, end)
+    while cut != -1 and (cut + 1 >= len(text) or text[cut + 1].isspace()):
+        cut = text.rfind("\n", low, cut)
+    return cut if cut == -1 else cut + 1
+
+
+def split_text(text, chunk_chars):
+    """
+    Cut text into pieces of about chunk_chars, preferring a line break that is
+    followed by a non-space character, then any whitespace, then a hard cut
+    """
+    chunks, start = [], 0
+    while len(text) - start > chunk_chars:
+        end = start + chunk_chars
+        cut = _line_cut(text, start + chunk_chars // 2, end)
+        if cut == -1:
+            cut = max(text.rfind(" ", start + 1, end), text.rfind("\t", start + 1, end))
+            if cut == -1:
+                cut = end
+        chunks.append(text[start:cut])
+        start = cut
+    chunks.append(text[start:])
+    return chunks
+
+
+def count_with_error(text, model_name):
+    """
+    Token count plus how far it can be from a single pass count. Texts of at
+    least CHA_TOKENIZER_PARALLEL_MIN_CHARS are encoded in pieces across all
+    cores, each cut can shift the total by about one token. Returns (None, 0)
+    when no encoding is available.
+    """
+    encoding = get_encoding(model_name)
+    if encoding is None:
+        return None, 0
+
+    text = str(text)
+    # NOTE: ordinary encoding counts special token text like any other text instead of raising
+    if len(text) < config.CHA_TOKENIZER_PARALLEL_MIN_CHARS:
+        return len(encoding.encode_ordinary(text)), 0
+
+    # tiktoken releases the gil while encoding, so threads use every core without copying the text to other processes
+    chunks = split_text(text, config.CHA_TOKENIZER_CHUNK_CHARS)
+    with ThreadPoolExecutor(min(len(chunks), os.cpu_count() or 1)) as executor:
+        total = sum(
+            executor.map(lambda chunk: len(encoding.encode_ordinary(chunk)), chunks)
+        )
+    return total, len(chunks) - 1
+
+
+def count_stream(stream, model_name, block_chars=None, progress=None):
+    """
+    Token count of a text stream read in blocks, only about two blocks are
+    held in memory at once. Each block is cut after its last clean line break
+    and the rest is carried into the next one. Returns (tokens, chars,
+    max_error) like count_with_error, tokens is None when no encoding is
+    available. progress is called with (tokens, chars) after every block.
+    """
+    encoding = get_encoding(model_name)
+    if encoding is None:
+        return None, 0, 0
+
+    block_chars = block_chars or config.CHA_TOKENIZER_CHUNK_CHARS
+    total, chars, max_error, pending = 0, 0, 0, ""
+    while True:
+        block = stream.read(block_chars)
+        chars += len(block)
+        pending += block
+        if not block:
+            break
+
+        cut = _line_cut(pending, 0, len(pending))
+        if cut == -1:
+            # NOTE: a very long line is cut at whitespace once it reaches two blocks, so memory stays bounded
+            if len(pending) < 2 * block_chars:
+                continue
+            cut = max(pending.rfind(" ", 1), pending.rfind("\t", 1))
+            if cut == -1:
+                cut = len(pending)
+        total += len(encoding.encode_ordinary(pending[:cut]))
+        pending = pending[cut:]
+        max_error += 1
+        if progress is not None:
+            progress(total, chars)
+
+    if pending:
+        total += len(encoding.encode_ordinary(pending))
+    return total, chars, max_error
+
+
+def count(text, model_name):
+    return count_with_error(text, model_name)[0]
+
+
+def count_many(texts, model_name):
+    """
+    Token counts for several texts at once, encoded in parallel by tiktoken's
+    batch API. Returns None for every text when no encoding is available.
+    """
+    texts = [str(text) for text in texts]
+    encoding = get_encoding(model_name)
+    if encoding is None:
+        return [None] * len(texts)
+    if len(texts) < 2 or any(
+        len(text) >= config.CHA_TOKENIZER_PARALLEL_MIN_CHARS for text in texts
+    ):
+        return [count(text, model_name) for text in texts]
+    return [
+        len(tokens)
+        for tokens in encoding.encode_ordinary_batch(
+            texts, num_threads=min(len(texts), os.cpu_count() or 1)
+        )
+    ]
@@ -312,15 +312,9 @@ def is_slow_model(model_name):
 def count_tokens(text, model_name, fast_mode=False, language=None, rounding=1.25):
     try:
         if fast_mode == False:
-            import tiktoken
+            from cha import tokenizer
 
-            try:
-                encoding = tiktoken.encoding_for_model(model_name)
-                return len(encoding.encode(text))
-            except:
-                new_model_name = "o1" if model_name.startswith("o") else "gpt-4o"
-                encoding = tiktoken.encoding_for_model(new_model_name)
-                return len(encoding.encode(text))
+            return tokenizer.count(text, model_name)
 
         word_count = len(text.split())
 
@@ -804,13 +798,15 @@ def format_size(size_bytes):
         return f"{size_bytes:.1f}^B"
 
 
-def format_path_for_fzf(path):
+def format_path_for_fzf(path, token_count=None):
     """
     format a file/directory path for better fzf display.
     returns: filename/:size_str:full_path for directories, filename:size_str:full_path for files
     """
     size = get_path_size(path)
     size_str = format_size(size)
+    if token_count is not None:
+        size_str += f" {token_count} tokens"
 
     if os.path.isdir(path):
         dirname = os.path.basename(path) or os.path.basename(os.path.dirname(path))
@@ -832,16 +828,17 @@ def extract_path_from_fzf_format(formatted_line):
     return formatted_line
 
 
-def format_paths_for_fzf(paths):
+def format_paths_for_fzf(paths, token_counts=None):
     """
-    format a list of paths for fzf display.
+    format a list of paths for fzf display, with each file's token count when given.
     returns: (formatted_paths_list, path_mapping_dict)
     """
     formatted_paths = []
     path_mapping = {}
+    token_counts = token_counts or {}
 
     for path in paths:
-        formatted = format_path_for_fzf(path)
+        formatted = format_path_for_fzf(path, token_counts.get(path))
         formatted_paths.append(formatted)
         path_mapping[formatted] = path
 
@@ -34,6 +34,6 @@ setup(
     ],
     python_requires=">=3.11",
     entry_points={
-        "console_scripts": ["cha = cha.main:cli"],
+        "console_scripts": ["cha = cha.dispatch:cli"],
     },
 )